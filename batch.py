@@ -0,0 +1,109 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from models import MissingField, Property
+
+SUMMARY_COLUMNS = [
+    "address",
+    "postcode",
+    "estimated_value",
+    "rental_yield",
+    "epc_rating",
+    "council_tax_band",
+    "plot_area_sqm",
+    "error",
+]
+
+# Response sections the summary reads; a cached response only has to be
+# fresh in these, so a day-old listings section doesn't force a refetch
+SUMMARY_SECTIONS = ["estimated_values", "estimated_rental_value", "energy_performance", "council_tax", "plot"]
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing ``rate`` calls per second."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def read_portfolio(file):
+    """Read a CSV of address/postcode rows, matching column names loosely."""
+    df = pd.read_csv(file, dtype=str).fillna("")
+    df.columns = [column.strip().lower() for column in df.columns]
+    missing = {"address", "postcode"} - set(df.columns)
+    if missing:
+        raise ValueError(f"CSV is missing column(s): {', '.join(sorted(missing))}")
+    if df.empty:
+        raise ValueError("CSV has no address rows")
+    return df[["address", "postcode"]]
+
+
+def fetch_many(rows, fetch, max_workers=8, rate_per_second=5.0):
+    """Fetch every (address, postcode) row concurrently.
+
+    ``fetch`` is called from worker threads, at most ``max_workers`` at a time
+    and no faster than ``rate_per_second``. Results are yielded in completion
+    order as ``(index, data, error)`` so the caller can report progress from
+    its own thread.
+    """
+    limiter = RateLimiter(rate_per_second)
+
+    def run(address, postcode):
+        limiter.acquire()
+        return fetch(address, postcode)
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {
+            pool.submit(run, address, postcode): index
+            for index, (address, postcode) in enumerate(rows)
+        }
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+    finally:
+        # Don't keep spending API budget if the caller stops early
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def summarise(address, postcode, data=None, error=None):
+    """Flatten one lookup into a row of the portfolio summary table."""
+    row = dict.fromkeys(SUMMARY_COLUMNS)
+    row.update(address=address, postcode=postcode)
+    if error is None:
+        try:
+            prop = Property(data)
+        except MissingField as e:
+            error = e
+    if error is not None:
+        row["error"] = str(error)
+        return row
+
+    latest = prop.get("latest_estimated_value")
+    row["estimated_value"] = latest.estimated_market_value if latest else None
+    row["rental_yield"] = prop.get("annual_rental_yield")
+    row["epc_rating"] = prop.get("epc_current_rating")
+    row["council_tax_band"] = prop.get("council_tax_band")
+    row["plot_area_sqm"] = prop.get("plot_area")
+    return row
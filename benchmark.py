@@ -0,0 +1,206 @@
+"""Headless benchmark of the dashboard's parse-and-render pipeline.
+
+    python benchmark.py                                  # print a report
+    python benchmark.py --save bench_baseline.json       # record a baseline
+    python benchmark.py --compare bench_baseline.json    # fail on regressions
+
+Each stage between Submit and a painted page is timed on synthetic
+responses of every profile in synthetic.PROFILES: JSON decode (whole and
+streamed in chunks), building the Property model, the pandas frames
+(thinned and aggregated for the charts), the Altair chart specs and the
+pydeck Deck JSON. The ``page`` stage renders the whole dashboard with
+Streamlit's AppTest against a replay corpus, caches cleared, so it also
+covers Streamlit's own overhead.
+"""
+import argparse
+import atexit
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from charts import estimated_value_chart, monthly_frame, monthly_sales_chart, price_bracket_chart
+from json_stream import insert, iter_members
+from map_builder import build_map_points, build_property_deck, payload_bytes
+from models import Property
+from street_client import STREAM_CHUNK_BYTES
+from synthetic import PROFILES, synthetic_response
+from timeseries import sales_series, value_series
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "streamlit_app.py")
+
+
+def _stages(raw_json):
+    """(name, callable) for each pipeline stage; later stages reuse earlier results."""
+    state = {}
+    raw = raw_json.encode("utf-8")
+
+    def decode():
+        state["data"] = json.loads(raw_json)
+
+    def stream_decode():
+        # The dashboard's path for live lookups: parsed as 64 KiB chunks arrive
+        body = {}
+        chunks = (raw[i:i + STREAM_CHUNK_BYTES] for i in range(0, len(raw), STREAM_CHUNK_BYTES))
+        for path, value in iter_members(chunks, ("data", "attributes")):
+            insert(body, path, value)
+
+    def parse():
+        prop = Property(state["data"])
+        # Touch the lazily parsed sections so their cost is counted here
+        prop.estimated_values, prop.schools, prop.title_polygons, prop.sale_listings, prop.completed_listings
+        state["prop"] = prop
+
+    def frames():
+        prop = state["prop"]
+        state["values"] = value_series(monthly_frame(
+            [(value.year, value.month, value.estimated_market_value) for value in prop.estimated_values],
+            ['year', 'month', 'estimated_market_value'],
+        ))
+        _, state["sales"] = sales_series(
+            monthly_frame(prop.sales_monthly, ['year', 'month', 'average_price', 'count_of_sales'])
+        )
+
+    def charts():
+        estimated_value_chart(state["values"]).to_dict()
+        monthly_sales_chart(state["sales"]).to_dict()
+        price_bracket_chart(state["prop"].sales_price_bracket).to_dict()
+
+    def deck():
+        prop = state["prop"]
+        payload_bytes(build_property_deck(prop, build_map_points(prop)))
+
+    return [("decode", decode), ("stream_decode", stream_decode), ("parse", parse), ("frames", frames), ("charts", charts), ("deck", deck)]
+
+
+def _page_stage(profile):
+    """Render the whole page through AppTest in replay mode."""
+    from streamlit.testing.v1 import AppTest
+    import streamlit as st
+
+    corpus = tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False)
+    with corpus:
+        address, postcode = "1 Benchmark Road", "BM1 1AA"
+        corpus.write(json.dumps({"address": address, "postcode": postcode,
+                                 "response": synthetic_response(profile, 0, address, postcode)}) + "\n")
+    atexit.register(os.remove, corpus.name)
+
+    def page():
+        os.environ["DATA_SOURCE_MODE"] = "replay"
+        os.environ["DATA_SOURCE_PATH"] = corpus.name
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        at = AppTest.from_file(APP_PATH, default_timeout=120)
+        at.run()
+        at.text_input[0].input(address)
+        at.text_input[1].input(postcode)
+        at.button[0].click().run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+
+    return page
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def measure(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+
+    # One extra traced run for memory; tracing slows code, so it isn't timed
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": statistics.median(samples) * 1000,
+        "p95_ms": _percentile(samples, 0.95) * 1000,
+        "max_ms": max(samples) * 1000,
+        "peak_kib": peak / 1024,
+    }
+
+
+def run(profiles, repeat, page):
+    results = {}
+    for profile in profiles:
+        raw_json = json.dumps(synthetic_response(profile))
+        stages = _stages(raw_json)
+        if page:
+            stages.append(("page", _page_stage(profile)))
+        for name, func in stages:
+            results[f"{profile}/{name}"] = measure(func, repeat if name != "page" else max(1, repeat // 5))
+        results[f"{profile}/response_kib"] = {"size_kib": len(raw_json) / 1024}
+    return results
+
+
+def report(results, baseline=None):
+    print(f"{'stage':<22}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'peak KiB':>11}{'vs base':>9}")
+    for name, stats in results.items():
+        if "size_kib" in stats:
+            print(f"{name:<22}{stats['size_kib']:>10.1f} KiB response")
+            continue
+        change = ""
+        if baseline and name in baseline:
+            change = f"{stats['p50_ms'] / baseline[name]['p50_ms'] - 1:+.0%}"
+        print(f"{name:<22}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['max_ms']:>10.2f}"
+              f"{stats['peak_kib']:>11.0f}{change:>9}")
+
+
+def regressions(results, baseline, threshold, floor_ms=1.0, floor_kib=64):
+    """(stage, metric, before, after) for every median latency or peak memory
+    figure that grew beyond the baseline by more than ``threshold``.
+
+    Figures under ``floor_ms`` or ``floor_kib`` in both runs are too noisy
+    to judge.
+    """
+    worse = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base or "p50_ms" not in stats:
+            continue
+        for metric, floor in (("p50_ms", floor_ms), ("peak_kib", floor_kib)):
+            if max(stats[metric], base[metric]) < floor:
+                continue
+            if stats[metric] > base[metric] * (1 + threshold):
+                worse.append((name, metric, base[metric], stats[metric]))
+    return worse
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="comma separated synthetic profiles")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per stage")
+    parser.add_argument("--no-page", action="store_true", help="skip the full AppTest page render")
+    parser.add_argument("--save", metavar="PATH", help="write results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="baseline to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed growth in a stage's median time or peak memory before failing (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = run(args.profiles.split(","), args.repeat, page=not args.no_page)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+    report(results, baseline)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if baseline:
+        worse = regressions(results, baseline, args.threshold)
+        for name, metric, before, after in worse:
+            print(f"REGRESSION {name} {metric}: {before:.2f} -> {after:.2f}", file=sys.stderr)
+        sys.exit(1 if worse else 0)
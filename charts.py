@@ -0,0 +1,87 @@
+import altair as alt
+import pandas as pd
+
+# Width of the fixed-size charts, in pixels
+CHART_WIDTH = 700
+
+
+def monthly_frame(records, columns):
+    """Build a date-sorted DataFrame from records carrying 'year' and 'month'."""
+    df = pd.DataFrame(records, columns=columns)
+
+    # Create a 'date' column from 'year' and 'month'
+    df['date'] = pd.to_datetime(df[['year', 'month']].assign(day=1))
+
+    # Sort the DataFrame by date and reset index to use 'date' in Altair
+    return df.sort_values('date').reset_index(drop=True)
+
+
+def estimated_value_chart(df_estimated_values):
+    # Find the minimum and maximum estimated market values
+    min_value = df_estimated_values['estimated_market_value'].min()
+    max_value = df_estimated_values['estimated_market_value'].max()
+
+    # Optional: Adjust the minimum value slightly lower for better visualization
+    y_axis_min = min_value * 0.98  # Adjust as needed
+
+    # Plot using Altair with custom y-axis range
+    return alt.Chart(df_estimated_values).mark_line().encode(
+        x=alt.X('date:T', title='Date'),
+        y=alt.Y('estimated_market_value:Q',
+                title='Estimated Market Value (£)',
+                scale=alt.Scale(domain=[y_axis_min, max_value]))
+    ).properties(
+        title='Estimated Market Value Over Time'
+    ).interactive()  # Enable zooming and panning
+
+
+def monthly_sales_chart(df_sales_monthly, title='Monthly Sales and Average Price'):
+    # Create base chart
+    base = alt.Chart(df_sales_monthly).encode(
+        x=alt.X('date:T', title='Date')
+    )
+
+    # Line chart for average price
+    line = base.mark_line(color='blue', strokeWidth=3).encode(
+        y=alt.Y('average_price:Q', axis=alt.Axis(title='Average Price (£)'), scale=alt.Scale(zero=False)),
+        tooltip=[alt.Tooltip('date:T', title='Date'),
+                alt.Tooltip('average_price:Q', title='Average Price (£)', format=',')]
+    )
+
+    # Bar chart for count of sales
+    bar = base.mark_bar(color='orange', opacity=0.6).encode(
+        y=alt.Y('count_of_sales:Q', axis=alt.Axis(title='Count of Sales')),
+        tooltip=[alt.Tooltip('date:T', title='Date'),
+                alt.Tooltip('count_of_sales:Q', title='Count of Sales')]
+    )
+
+    # Layer the charts and use dual y-axes
+    return alt.layer(
+        bar,
+        line.encode(y=alt.Y('average_price:Q', axis=alt.Axis(title='Average Price (£)', orient='right'), scale=alt.Scale(zero=False)))
+    ).resolve_scale(
+        y='independent'  # Use independent scales for y-axes
+    ).properties(
+        width=CHART_WIDTH,
+        height=400,
+        title=title
+    ).interactive()
+
+
+def price_bracket_chart(sales_price_bracket):
+    df_price_bracket = pd.DataFrame(sales_price_bracket)
+
+    return alt.Chart(df_price_bracket).mark_bar(color='teal').encode(
+        x=alt.X('price_bracket_name:N', sort='ascending', title='Price Bracket'),
+        y=alt.Y('count_of_sales:Q', title='Count of Sales'),
+        tooltip=[
+            alt.Tooltip('price_bracket_name:N', title='Price Bracket'),
+            alt.Tooltip('count_of_sales:Q', title='Count of Sales')
+        ]
+    ).properties(
+        width=CHART_WIDTH,
+        height=400,
+        title='Sales by Price Bracket'
+    ).configure_axisX(
+        labelAngle=-45  # Rotate x-axis labels for better readability
+    )
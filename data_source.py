@@ -0,0 +1,106 @@
+"""Where property lookups come from.
+
+``DATA_SOURCE_MODE`` (environment variable or Streamlit secret) selects:
+
+- ``live`` (default): the Street Data API.
+- ``replay``: recorded responses read from ``DATA_SOURCE_PATH``, either a
+  JSONL file or a directory of ``.json``/``.jsonl`` files. Each record is
+  ``{"address": ..., "postcode": ..., "tier": ..., "response": {...}}``.
+  No network or API key is needed.
+- ``record``: the live API, appending every successful response to the
+  JSONL file at ``DATA_SOURCE_PATH`` in the format ``replay`` reads.
+
+Every source has the client's ``lookup(address, postcode, tier)`` and
+``lookup_events(address, postcode, tier)`` methods.
+"""
+import glob
+import json
+import os
+import threading
+
+from json_stream import insert, iter_members
+from response_cache import cache_key
+from street_client import STREAM_CHUNK_BYTES, StreetDataError
+
+MODES = ("live", "replay", "record")
+
+
+def read_records(path):
+    """Yield recorded lookups from a JSONL file or a directory of them."""
+    if os.path.isdir(path):
+        paths = sorted(glob.glob(os.path.join(path, "*.json")) + glob.glob(os.path.join(path, "*.jsonl")))
+    else:
+        paths = [path]
+    for file_path in paths:
+        with open(file_path, "r", encoding="utf-8") as file:
+            if file_path.endswith(".json"):
+                yield json.load(file)
+                continue
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class ReplaySource:
+    """Serves recorded responses, keyed like the response cache."""
+
+    # Replayed data must never leak into the live response cache
+    cacheable = False
+
+    def __init__(self, path):
+        self.path = path
+        self.responses = {
+            cache_key(record["address"], record["postcode"], record.get("tier", "premium")): record["response"]
+            for record in read_records(path)
+        }
+
+    def lookup(self, address, postcode, tier="premium"):
+        try:
+            return self.responses[cache_key(address, postcode, tier)]
+        except KeyError:
+            raise StreetDataError(
+                f"No recorded response for {address}, {postcode} in {self.path}", status=404
+            ) from None
+
+    def lookup_events(self, address, postcode, tier="premium"):
+        """Replay a response through the streaming parser, as the client's ``lookup_events`` would."""
+        body = json.dumps(self.lookup(address, postcode, tier)).encode("utf-8")
+        chunks = (body[i:i + STREAM_CHUNK_BYTES] for i in range(0, len(body), STREAM_CHUNK_BYTES))
+        return iter_members(chunks, ("data", "attributes"))
+
+    def addresses(self):
+        """(address, postcode) of every recorded lookup, e.g. to drive a load test."""
+        return [tuple(key.split("|")[2:0:-1]) for key in self.responses]
+
+
+class RecordingSource:
+    """Passes lookups through to ``source`` and appends each response to a JSONL file."""
+
+    cacheable = True
+
+    def __init__(self, source, path):
+        self.source = source
+        self.path = path
+        self._lock = threading.Lock()
+
+    def lookup(self, address, postcode, tier="premium"):
+        response = self.source.lookup(address, postcode, tier)
+        self._record(address, postcode, tier, response)
+        return response
+
+    def lookup_events(self, address, postcode, tier="premium"):
+        response = {}
+        for path, value in self.source.lookup_events(address, postcode, tier):
+            insert(response, path, value)
+            yield path, value
+        self._record(address, postcode, tier, response)
+
+    def _record(self, address, postcode, tier, response):
+        record = {"address": address, "postcode": postcode, "tier": tier, "response": response}
+        line = json.dumps(record, separators=(",", ":"))
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(line + "\n")
+
+    def __getattr__(self, name):
+        # latency_summary() and friends come from the wrapped client
+        return getattr(self.source, name)
@@ -0,0 +1,106 @@
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_008.8
+TILE_SIZE = 256  # pixels per Web Mercator tile, as used by deck.gl
+METRES_PER_DEGREE_LAT = np.pi * EARTH_RADIUS_M / 180
+
+
+def bounds(lats, lons):
+    """(min_lat, min_lon, max_lat, max_lon) over any number of coordinate arrays."""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    return (
+        float(np.nanmin(lats)), float(np.nanmin(lons)),
+        float(np.nanmax(lats)), float(np.nanmax(lons)),
+    )
+
+
+def centre(box):
+    min_lat, min_lon, max_lat, max_lon = box
+    return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+
+def centroid(lats, lons):
+    """Mean position of a set of points (fine at neighbourhood scale)."""
+    return float(np.nanmean(lats)), float(np.nanmean(lons))
+
+
+def _mercator_y(lat):
+    lat = np.radians(np.clip(lat, -85.05112878, 85.05112878))
+    return (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2
+
+
+def fit_zoom(box, width=700, height=500, padding=40, min_zoom=1, max_zoom=18):
+    """Largest zoom at which ``box`` fits a ``width`` x ``height`` pixel viewport."""
+    min_lat, min_lon, max_lat, max_lon = box
+    # Extent as a fraction of the whole Web Mercator world
+    dx = (max_lon - min_lon) / 360
+    dy = abs(_mercator_y(min_lat) - _mercator_y(max_lat))
+    usable_width = max(width - 2 * padding, 1)
+    usable_height = max(height - 2 * padding, 1)
+    with np.errstate(divide='ignore'):
+        zoom = min(
+            np.log2(usable_width / (dx * TILE_SIZE)) if dx > 0 else max_zoom,
+            np.log2(usable_height / (dy * TILE_SIZE)) if dy > 0 else max_zoom,
+        )
+    return float(np.clip(np.floor(zoom * 4) / 4, min_zoom, max_zoom))
+
+
+def haversine(lat, lon, lats, lons):
+    """Great-circle distance in metres from (lat, lon) to each of lats/lons."""
+    lat1 = np.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=float))
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(lons, dtype=float) - lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+class GridIndex:
+    """Fixed-size lat/lon grid over a set of points for radius queries.
+
+    Points are bucketed into cells roughly ``cell_metres`` across (in the
+    style of a geohash grid). A radius query only measures the points in
+    the cells the circle overlaps, so it stays cheap with thousands of
+    points.
+    """
+
+    def __init__(self, lats, lons, cell_metres=500):
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        reference_lat = float(np.nanmean(self.lats)) if np.isfinite(self.lats).any() else 0.0
+        self.cell_lat = cell_metres / METRES_PER_DEGREE_LAT
+        self.cell_lon = self.cell_lat / max(np.cos(np.radians(reference_lat)), 0.01)
+
+        # Points without coordinates are never returned
+        valid = np.flatnonzero(np.isfinite(self.lats) & np.isfinite(self.lons))
+        rows = np.floor(self.lats[valid] / self.cell_lat).astype(np.int64)
+        cols = np.floor(self.lons[valid] / self.cell_lon).astype(np.int64)
+        order = np.lexsort((cols, rows))
+        cells, starts = np.unique(np.stack([rows[order], cols[order]], axis=1), axis=0, return_index=True)
+        groups = np.split(valid[order], starts[1:])
+        self._cells = {(int(row), int(col)): group for (row, col), group in zip(cells, groups)}
+
+    def __len__(self):
+        return len(self.lats)
+
+    def within(self, lat, lon, radius_metres):
+        """Indices of points within ``radius_metres`` of (lat, lon), nearest first."""
+        if not self._cells:
+            return np.empty(0, dtype=np.int64)
+        row_span = int(np.ceil(radius_metres / METRES_PER_DEGREE_LAT / self.cell_lat))
+        col_span = int(np.ceil(radius_metres / METRES_PER_DEGREE_LAT / np.cos(np.radians(lat)) / self.cell_lon))
+        row = int(np.floor(lat / self.cell_lat))
+        col = int(np.floor(lon / self.cell_lon))
+        candidates = [
+            self._cells[(r, c)]
+            for r in range(row - row_span, row + row_span + 1)
+            for c in range(col - col_span, col + col_span + 1)
+            if (r, c) in self._cells
+        ]
+        if not candidates:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.concatenate(candidates)
+        distances = haversine(lat, lon, self.lats[candidates], self.lons[candidates])
+        keep = distances <= radius_metres
+        return candidates[keep][np.argsort(distances[keep], kind='stable')]
@@ -0,0 +1,196 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("property_dashboard")
+
+# Histogram bucket bounds in seconds, from a cached section to a slow API call
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "dashboard_lookup_seconds": "Time from Submit to the whole response parsed, cache hits and sections drawn meanwhile included.",
+    "dashboard_first_section_seconds": "Time from Submit to the first dashboard section being drawn.",
+    "dashboard_lookup_failures_total": "Lookups that raised, by exception type.",
+    "dashboard_section_seconds": "Time spent rendering each dashboard section.",
+    "dashboard_section_failures_total": "Dashboard sections that failed or had missing data, by exception type.",
+    "street_data_request_seconds": "Street Data API request latency including retries, by final status; time to first byte for streamed lookups.",
+    "street_data_body_seconds": "Time spent downloading streamed Street Data response bodies, parsing and rendering excluded.",
+    "street_data_response_bytes_total": "Bytes received from the Street Data API.",
+    "street_data_request_failures_total": "Street Data API requests that got no response, by exception type.",
+    "response_cache_events": "Response cache hits, misses, writes and evictions since start, by event.",
+    "response_cache_entries": "Responses held by the response cache, by store.",
+    "property_store_failures_total": "Responses that couldn't be added to the comparables store, by exception type.",
+    "prefetch_lookups_total": "Watchlist prefetch lookups, by result.",
+    "prefetch_views_total": "Dashboard views of watched addresses, by whether a prefetch had warmed them.",
+}
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, **extra):
+    pairs = list(labels) + sorted(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{str(value)}"' for key, value in pairs) + "}"
+
+
+class Metrics:
+    """Thread-safe in-process counters, gauges and histograms."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0, "last": 0.0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+            histogram["last"] = value
+
+    def snapshot(self):
+        """Plain rows of every series, for display."""
+        with self._lock:
+            rows = [
+                {"metric": name, "labels": dict(labels), "count": h["count"], "mean": h["sum"] / h["count"], "last": h["last"]}
+                for (name, labels), h in self._histograms.items()
+            ]
+            rows += [{"metric": name, "labels": dict(labels), "value": value} for (name, labels), value in self._counters.items()]
+            rows += [{"metric": name, "labels": dict(labels), "value": value} for (name, labels), value in self._gauges.items()]
+        return rows
+
+    def to_prometheus(self):
+        """Render every series in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            series = {}
+            for (name, labels), value in self._counters.items():
+                series.setdefault((name, "counter"), []).append((labels, value))
+            for (name, labels), value in self._gauges.items():
+                series.setdefault((name, "gauge"), []).append((labels, value))
+            for (name, labels), histogram in self._histograms.items():
+                series.setdefault((name, "histogram"), []).append((labels, dict(histogram, buckets=list(histogram["buckets"]))))
+
+        for (name, kind), samples in sorted(series.items()):
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(samples, key=lambda sample: sample[0]):
+                if kind != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+                    continue
+                for bound, count in zip(self.buckets, value["buckets"]):
+                    lines.append(f"{name}_bucket{_format_labels(labels, le=bound)} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels, le='+Inf')} {value['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the Prometheus text to ``path`` atomically (node_exporter textfile style)."""
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(self.to_prometheus())
+        os.replace(temporary, path)
+
+
+METRICS = Metrics()
+
+
+def configure_logging(level="INFO"):
+    """Send structured events to stderr, one JSON object per line."""
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(level)
+
+
+def log_event(event, **fields):
+    """Log one structured (JSON) event, tagged with the current request id."""
+    fields.setdefault("request_id", _request_id.get())
+    logger.info(json.dumps({"event": event, "time": time.time(), **fields}, default=str))
+
+
+def current_request_id():
+    """The id of the lookup in progress, or a fresh one outside of a lookup."""
+    return _request_id.get() or uuid.uuid4().hex
+
+
+@contextmanager
+def request_context(request_id=None):
+    """Tag everything logged inside the block with one request id."""
+    token = _request_id.set(request_id or uuid.uuid4().hex)
+    try:
+        yield _request_id.get()
+    finally:
+        _request_id.reset(token)
+
+
+@contextmanager
+def timed(name, metrics=METRICS, **labels):
+    """Observe the block's duration as ``{name}_seconds``.
+
+    If the block raises, ``{name}_failures_total`` is incremented with the
+    exception type as a label and the exception propagates.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        metrics.inc(f"{name}_failures_total", exception=type(e).__name__, **labels)
+        log_event(f"{name}_failed", exception=type(e).__name__, message=str(e), **labels)
+        raise
+    finally:
+        metrics.observe(f"{name}_seconds", time.perf_counter() - started, **labels)
+
+
+def serve_metrics(port, metrics=METRICS, host="127.0.0.1"):
+    """Serve ``/metrics`` for Prometheus to scrape from a daemon thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-server").start()
+    return server
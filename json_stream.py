@@ -0,0 +1,146 @@
+"""Incremental parsing of one JSON object as its bytes arrive.
+
+``iter_members(chunks, path)`` walks down the objects named by ``path``
+(``("data", "attributes")`` for a Street Data response) and yields
+``(member_path, value)`` for every member along the way as soon as that
+member's value is complete, and ``(member_path, {})`` on entering each
+object along ``path`` so that even an empty one can be rebuilt. Only the member currently being received is
+held as text, so peak memory is bounded by the largest single member, not
+by the whole body. Members are decoded by the json module's C decoder.
+"""
+import codecs
+import json
+import re
+
+_DECODER = json.JSONDecoder()
+# A member's key, the colon and the first character of its value
+_KEY = re.compile(r'\s*"([^"\\]*(?:\\.[^"\\]*)*)"\s*:\s*(?=\S)', re.S)
+# The end of a number, true, false or null
+_SCALAR_END = re.compile(r'[\s,}\]]')
+_SPACE = re.compile(r'\s*')
+
+# Text that still doesn't parse after this many characters is malformed,
+# not incomplete
+_MAX_PENDING = 64 * 1024
+
+
+class _Scanner:
+    def __init__(self, path):
+        self.path = tuple(path)
+        self.text = ""
+        self.pos = 0
+        self.prefix = []
+        # "start", "first" (member or "}"), "next" ("," or "}"), "member", "value" or "done"
+        self.state = "start"
+        self.value_start = self.retry_at = 0
+        self.key = None
+
+    def feed(self, text):
+        self.text += text
+
+    def _skip_space(self):
+        self.pos = _SPACE.match(self.text, self.pos).end()
+        return self.pos < len(self.text)
+
+    def events(self, final=False):
+        """Yield every member completed by the text fed so far."""
+        while self.state != "done":
+            if self.state == "value":
+                decoded = self._value(final)
+                if decoded is None:
+                    return
+                value, end = decoded
+                yield tuple(self.prefix) + (self.key,), value
+                # Drop the text of finished members so it can be freed
+                self.text = self.text[end:]
+                self.pos = 0
+                self.state = "next"
+                continue
+
+            if not self._skip_space():
+                return
+            char = self.text[self.pos]
+            if self.state == "start":
+                self._expect(char, "{")
+                self.pos += 1
+                self.state = "first"
+            elif self.state in ("first", "next") and char == "}":
+                self.pos += 1
+                if self.prefix:
+                    self.prefix.pop()
+                    self.state = "next"
+                else:
+                    self.state = "done"
+            elif self.state == "next":
+                self._expect(char, ",")
+                self.pos += 1
+                self.state = "member"
+            else:
+                match = _KEY.match(self.text, self.pos)
+                if match is None:
+                    if len(self.text) - self.pos > _MAX_PENDING or final:
+                        raise ValueError(f"expected an object member at {self.text[self.pos:self.pos + 20]!r}")
+                    return
+                self.key = json.loads(f'"{match.group(1)}"')
+                self.pos = match.end()
+                depth = len(self.prefix)
+                if depth < len(self.path) and self.key == self.path[depth] and self.text[self.pos] == "{":
+                    yield tuple(self.prefix) + (self.key,), {}
+                    self.prefix.append(self.key)
+                    self.pos += 1
+                    self.state = "first"
+                else:
+                    self.value_start = self.pos
+                    self.retry_at = 0
+                    self.state = "value"
+
+    def _expect(self, char, expected):
+        if char != expected:
+            raise ValueError(f"expected {expected!r}, got {self.text[self.pos:self.pos + 20]!r}")
+
+    def _value(self, final):
+        """(value, end offset) of the member at ``value_start``, or None if it isn't all here yet."""
+        text = self.text
+        if text[self.value_start] not in '{["':
+            # A number could go on in the next chunk, so wait for what ends it
+            match = _SCALAR_END.search(text, self.value_start)
+            if match is None and not final:
+                return None
+        elif len(text) - self.value_start < self.retry_at and not final:
+            return None
+        try:
+            return _DECODER.raw_decode(text, self.value_start)
+        except ValueError:
+            if final:
+                raise
+            # Only try again once the member's text has doubled, so a large
+            # member costs at most about twice one decode however it's split
+            self.retry_at = 2 * (len(text) - self.value_start)
+            return None
+
+
+def iter_members(chunks, path=()):
+    """Yield (member_path, value) for the members of each object along ``path``.
+
+    ``chunks`` is any iterable of ``bytes``. Members are yielded in the
+    order they appear; objects named by ``path`` are yielded empty and then
+    descended into, so ``insert`` rebuilds the whole document. Raises
+    ``ValueError`` on malformed or truncated input.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    scanner = _Scanner(path)
+    for chunk in chunks:
+        scanner.feed(decoder.decode(chunk))
+        yield from scanner.events()
+    scanner.feed(decoder.decode(b"", final=True))
+    yield from scanner.events(final=True)
+    if scanner.state != "done":
+        raise ValueError("JSON document ended early")
+
+
+def insert(body, path, value):
+    """Set ``value`` at ``path`` in nested dicts, creating them as needed."""
+    node = body
+    for key in path[:-1]:
+        node = node.setdefault(key, {})
+    node[path[-1]] = value
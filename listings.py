@@ -0,0 +1,78 @@
+import math
+
+import pandas as pd
+
+# Sort choices for the listings grid: label -> (column, ascending)
+SORT_OPTIONS = {
+    "Newest first": ("listed_date", False),
+    "Oldest first": ("listed_date", True),
+    "Price: low to high": ("price", True),
+    "Price: high to low": ("price", False),
+    "Most bedrooms": ("number_of_bedrooms", False),
+    "Nearest": ("distance_in_metres", True),
+}
+
+# Columns shown when the listings are viewed as a table
+TABLE_COLUMNS = ['address', 'listing_type', 'listed_date', 'number_of_bedrooms', 'status', 'price', 'distance_in_metres']
+
+
+def listings_frame(listings):
+    """One typed row per listing, for filtering, sorting and paging."""
+    df = pd.DataFrame(
+        [(listing.address, listing.listing_type, listing.listed_date, listing.number_of_bedrooms, listing.status,
+          listing.price, listing.main_image_url, listing.distance_in_metres) for listing in listings],
+        columns=['address', 'listing_type', 'listed_date', 'number_of_bedrooms', 'status', 'price',
+                 'main_image_url', 'distance_in_metres'],
+    )
+    # Missing values arrive as 'N/A' or None; make them NaN/NaT so they
+    # drop out of filters and sort last
+    df['listed_date'] = pd.to_datetime(df['listed_date'], errors='coerce')
+    for column in ('number_of_bedrooms', 'price', 'distance_in_metres'):
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    return df
+
+
+def filter_listings(df, price_range=None, min_bedrooms=None, listed_since=None, max_distance=None):
+    """Rows matching every filter given; a filter left as None matches everything."""
+    mask = pd.Series(True, index=df.index)
+    if price_range is not None:
+        mask &= df['price'].between(*price_range)
+    if min_bedrooms is not None:
+        mask &= df['number_of_bedrooms'] >= min_bedrooms
+    if listed_since is not None:
+        mask &= df['listed_date'] >= pd.Timestamp(listed_since)
+    if max_distance is not None:
+        mask &= df['distance_in_metres'] <= max_distance
+    return df[mask]
+
+
+def sort_listings(df, sort):
+    column, ascending = SORT_OPTIONS[sort]
+    return df.sort_values(column, ascending=ascending, na_position='last', kind='stable')
+
+
+def page_count(rows, page_size):
+    return max(1, math.ceil(rows / page_size))
+
+
+def listings_page(df, page, page_size):
+    """Rows of 1-based ``page``."""
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size]
+
+
+def card_markdown(row):
+    """A whole listing card as one Markdown block."""
+    listed = row.listed_date.date() if not pd.isna(row.listed_date) else 'N/A'
+    bedrooms = int(row.number_of_bedrooms) if not pd.isna(row.number_of_bedrooms) else 'N/A'
+    price = f"£{int(row.price):,}" if not pd.isna(row.price) else 'N/A'
+    distance = f"{int(row.distance_in_metres):,} m" if not pd.isna(row.distance_in_metres) else 'N/A'
+    return "  \n".join([
+        f"**Address:** {row.address}",
+        f"**Listing Type:** {row.listing_type}",
+        f"**Listed Date:** {listed}",
+        f"**Bedrooms:** {bedrooms}",
+        f"**Status:** {row.status}",
+        f"**Price:** {price}",
+        f"**Distance:** {distance}",
+    ])
@@ -0,0 +1,224 @@
+import os
+import threading
+import time
+
+import streamlit as st
+
+from data_source import MODES, RecordingSource, ReplaySource
+from instrumentation import METRICS, log_event
+from json_stream import insert
+from prefetch import PrefetchScheduler, Watchlist, parse_window
+from property_store import PropertyStore
+from response_cache import OutcodeCache, ResponseCache, split_outcode_statistics
+from street_client import StreetDataClient, StreetDataError
+from thumbnails import ThumbnailCache
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+
+def setting(name, default=None):
+    """Read a setting from the environment, then Streamlit secrets."""
+    if name in os.environ:
+        return os.environ[name]
+    try:
+        return st.secrets[name]
+    except (KeyError, FileNotFoundError):
+        return default
+
+
+@st.cache_resource
+def get_response_cache():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return ResponseCache(os.path.join(CACHE_DIR, "responses.sqlite"))
+
+
+@st.cache_resource
+def get_outcode_cache():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return OutcodeCache(os.path.join(CACHE_DIR, "responses.sqlite"))
+
+
+@st.cache_resource
+def get_property_store():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return PropertyStore(setting("PROPERTY_STORE_PATH", os.path.join(CACHE_DIR, "properties.sqlite")))
+
+
+@st.cache_resource
+def get_thumbnail_cache():
+    return ThumbnailCache(os.path.join(CACHE_DIR, "thumbnails"))
+
+
+@st.cache_resource
+def get_client():
+    # A missing key only matters once a lookup misses the cache
+    return StreetDataClient(setting("DATA_STREET_KEY"), pool_maxsize=16)
+
+
+@st.cache_resource
+def get_data_source():
+    mode = setting("DATA_SOURCE_MODE", "live")
+    if mode not in MODES:
+        raise ValueError(f"DATA_SOURCE_MODE must be one of {', '.join(MODES)}, not {mode!r}")
+    if mode == "live":
+        return get_client()
+    path = setting("DATA_SOURCE_PATH")
+    if not path:
+        raise ValueError(f"DATA_SOURCE_PATH must be set in {mode} mode")
+    if mode == "replay":
+        return ReplaySource(path)
+    return RecordingSource(get_client(), path)
+
+
+def save_response(cache, source, address, postcode, data, tier="premium", store=None, statistics=None,
+                  fetched_at=None):
+    """Put a freshly fetched response wherever the dashboard will read it from.
+
+    Nothing from a source that isn't cacheable (replayed or benchmark data)
+    is kept, so it never mixes with live data.
+    """
+    if "data" not in data or not source.cacheable:
+        return
+    if statistics is not None:
+        # Outcode statistics are stored once per outcode, not in every response
+        stripped = statistics.strip(address, postcode, data)
+    else:
+        stripped = data
+    cache.put(address, postcode, stripped, tier, fetched_at)
+    if store is not None:
+        try:
+            store.ingest(address, postcode, data, tier)
+        except Exception as e:
+            # The comparables store is a by-product; the lookup itself succeeded
+            METRICS.inc("property_store_failures_total", exception=type(e).__name__)
+            log_event("property_store_failed", address=address, postcode=postcode, error=f"{type(e).__name__}: {e}")
+
+
+def cached_lookup(cache, source, address, postcode, tier="premium", store=None, statistics=None, sections=None):
+    """Return the response for an address, only asking ``source`` on a miss.
+
+    A cached response is used if it is fresh in ``sections`` (see
+    ``ResponseCache.get``), by default all of them. Every response fetched from ``source`` is also added to ``store``, if
+    given, and has its outcode statistics kept in ``statistics`` (an
+    ``OutcodeCache``) rather than in ``cache``. Safe to call from worker
+    threads, unlike ``lookup_property`` which resolves the shared caches
+    and source through Streamlit.
+    """
+    data = cache.get(address, postcode, tier, sections) if source.cacheable else None
+    if data is not None:
+        return statistics.join(postcode, data) if statistics is not None else data
+
+    data = source.lookup(address, postcode, tier)
+    save_response(cache, source, address, postcode, data, tier, store, statistics)
+    return data
+
+
+def stream_lookup(cache, source, address, postcode, tier="premium", store=None, statistics=None):
+    """Like ``cached_lookup``, but yield (body, attribute, fetched_at) as each attribute arrives.
+
+    ``body`` is the same dict every time, filled in as the response is
+    parsed. The last item is (body, None, fetched_at) once the whole
+    response is in and saved; a cached response is yielded only that way,
+    complete. ``fetched_at`` is when this version of the response was
+    fetched, so anything derived from it can be keyed on it.
+    """
+    entry = cache.get_entry(address, postcode, tier) if source.cacheable else None
+    if entry is not None:
+        data, fetched_at = entry
+        yield (statistics.join(postcode, data) if statistics is not None else data), None, fetched_at
+        return
+
+    data = {}
+    fetched_at = time.time()
+    for path, value in source.lookup_events(address, postcode, tier):
+        insert(data, path, value)
+        if len(path) == 3 and path[:2] == ("data", "attributes"):
+            yield data, path[2], fetched_at
+    save_response(cache, source, address, postcode, data, tier, store, statistics, fetched_at)
+    yield data, None, fetched_at
+
+
+def refresh_outcode_statistics(statistics, cache, source, store=None, limit=10):
+    """Refetch outcodes whose statistics are due, one lookup of a known address each.
+
+    Returns the number of outcodes refreshed. An outcode whose lookup
+    fails, or comes back without outcode statistics, is tried again once
+    ``statistics.retry_after`` has passed, not on the next run.
+    """
+    refreshed = 0
+    for area, address, postcode in statistics.due(limit):
+        statistics.attempted(area)
+        try:
+            data = source.lookup(address, postcode)
+        except StreetDataError as e:
+            log_event("outcode_refresh_failed", outcode=area, error=str(e))
+            continue
+        save_response(cache, source, address, postcode, data, store=store, statistics=statistics)
+        if split_outcode_statistics(data)[1] is None:
+            log_event("outcode_refresh_failed", outcode=area, error="no outcode statistics in the response")
+            continue
+        refreshed += 1
+    return refreshed
+
+
+@st.cache_resource
+def start_outcode_refresh(interval):
+    """Refresh due outcode statistics every ``interval`` seconds from a daemon thread."""
+    args = (get_outcode_cache(), get_response_cache(), get_data_source(), get_property_store())
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                refresh_outcode_statistics(*args)
+            except Exception as e:
+                log_event("outcode_refresh_failed", error=f"{type(e).__name__}: {e}")
+
+    threading.Thread(target=run, daemon=True, name="outcode-refresh").start()
+    return stop
+
+
+@st.cache_resource
+def get_watchlist():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return Watchlist(setting("WATCHLIST_PATH", os.path.join(CACHE_DIR, "watchlist.sqlite")))
+
+
+@st.cache_resource
+def get_prefetch_scheduler():
+    cache, source = get_response_cache(), get_data_source()
+    store, statistics = get_property_store(), get_outcode_cache()
+    window = setting("PREFETCH_WINDOW")
+
+    def fetch(address, postcode, tier):
+        data = source.lookup(address, postcode, tier)
+        save_response(cache, source, address, postcode, data, tier, store, statistics)
+
+    return PrefetchScheduler(
+        get_watchlist(), fetch, cache.fresh,
+        rate_per_second=float(setting("PREFETCH_RATE", 0.5)),
+        daily_budget=int(setting("PREFETCH_DAILY_BUDGET", 200)),
+        window=parse_window(window) if window else None,
+    )
+
+
+@st.cache_resource
+def start_prefetch(interval):
+    """Run the prefetch scheduler every ``interval`` seconds from a daemon thread."""
+    return get_prefetch_scheduler().start(interval)
+
+
+def lookup_property(address, postcode, tier="premium"):
+    """Return the Street Data response for an address, from cache if fresh."""
+    return cached_lookup(
+        get_response_cache(), get_data_source(), address, postcode, tier,
+        store=get_property_store(), statistics=get_outcode_cache(),
+    )
+
+
+def lookup_property_stream(address, postcode, tier="premium"):
+    """``lookup_property`` as a stream of (body, attribute, fetched_at); see ``stream_lookup``."""
+    return stream_lookup(
+        get_response_cache(), get_data_source(), address, postcode, tier,
+        store=get_property_store(), statistics=get_outcode_cache(),
+    )
@@ -0,0 +1,217 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pydeck as pdk
+
+from geometry import METRES_PER_DEGREE_LAT, GridIndex, bounds, centre, fit_zoom, haversine
+
+# Viewport the zoom is fitted to (st.pydeck_chart's default height)
+MAP_WIDTH = 700
+MAP_HEIGHT = 500
+
+# Polygons are simplified to this many screen pixels at the initial zoom
+SIMPLIFY_PIXELS = 1.0
+
+# Only these columns are used by the tooltip, so only these are shipped
+TOOLTIP_COLUMNS = ['name', 'types', 'distance_in_metres']
+
+
+def metres_per_pixel(zoom, latitude):
+    return 156543.03392 * math.cos(math.radians(latitude)) / 2 ** zoom
+
+
+def zoom_tolerance(zoom, latitude, pixels=SIMPLIFY_PIXELS):
+    """Simplification tolerance, in degrees of latitude, for a zoom level."""
+    return pixels * metres_per_pixel(zoom, latitude) / METRES_PER_DEGREE_LAT
+
+
+def quantise_decimals(tolerance):
+    """Decimal places that keep rounding error under half the tolerance."""
+    return int(np.clip(math.ceil(-math.log10(tolerance / 2)), 4, 7))
+
+
+def simplify_ring(ring, tolerance):
+    """Douglas-Peucker simplification of a closed [lon, lat] ring.
+
+    Distances are measured with longitude scaled by cos(latitude), so
+    ``tolerance`` is in degrees of latitude. A ring is never reduced below
+    a closed triangle.
+    """
+    ring = np.asarray(ring, dtype=float)
+    if len(ring) <= 4:
+        return ring
+    scale = math.cos(math.radians(float(ring[:, 1].mean())))
+    xy = np.column_stack([ring[:, 0] * scale, ring[:, 1]])
+
+    keep = np.zeros(len(ring), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(ring) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a, b = xy[start], xy[end]
+        points = xy[start + 1:end]
+        segment = b - a
+        length = math.hypot(*segment)
+        if length == 0:
+            # The closing segment of a ring starts and ends at the same point
+            distances = np.hypot(*(points - a).T)
+        else:
+            distances = np.abs(segment[0] * (points[:, 1] - a[1]) - segment[1] * (points[:, 0] - a[0])) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    simplified = ring[keep]
+    return simplified if len(simplified) >= 4 else ring
+
+
+def build_map_points(prop):
+    """School and sale listing points for the map, each with a spatial index."""
+    property_lat, property_lon = prop.location
+
+    # Create a DataFrame for schools from every education category
+    df_schools = pd.DataFrame(
+        [(school.name, school.latitude, school.longitude, school.types, school.distance_in_metres)
+         for school in prop.get('schools', [])],
+        columns=['name', 'latitude', 'longitude', 'types', 'distance_in_metres'],
+    )
+
+    # Sale listings that carry coordinates, labelled to fit the same tooltip
+    df_listings = pd.DataFrame(
+        [(listing.address, listing.latitude, listing.longitude, f"{listing.listing_type} listing")
+         for listing in prop.get('sale_listings', []) if listing.latitude is not None],
+        columns=['name', 'latitude', 'longitude', 'types'],
+    )
+    df_listings['distance_in_metres'] = haversine(
+        property_lat, property_lon, df_listings['latitude'], df_listings['longitude']
+    ).round()
+
+    return (
+        df_schools, GridIndex(df_schools['latitude'], df_schools['longitude']),
+        df_listings, GridIndex(df_listings['latitude'], df_listings['longitude']),
+    )
+
+
+def _point_records(df, decimals):
+    """Slim records for a ScatterplotLayer: a rounded position plus tooltip fields."""
+    positions = np.column_stack([
+        df['longitude'].to_numpy(dtype=float).round(decimals),
+        df['latitude'].to_numpy(dtype=float).round(decimals),
+    ]).tolist()
+    records = df[TOOLTIP_COLUMNS].assign(
+        distance_in_metres=df['distance_in_metres'].fillna(0).round().astype(int)
+    ).to_dict('records')
+    for record, position in zip(records, positions):
+        record['position'] = position
+    return records
+
+
+def build_property_deck(prop, points, radius=None, width=MAP_WIDTH, height=MAP_HEIGHT):
+    """Deck with every title polygon, schools, listings and the property itself."""
+    polygons = [[np.asarray(ring, dtype=float) for ring in polygon] for polygon in prop.title_polygons]
+    if not polygons:
+        raise IndexError("no title polygons")
+    outer_rings = np.concatenate([polygon[0] for polygon in polygons])
+
+    # Extract property location (add this to mark the house location)
+    property_lat, property_lon = prop.location
+
+    # Keep only the points within the chosen radius, if any
+    df_schools, school_index, df_listings, listing_index = points
+    if radius is not None:
+        df_schools = df_schools.iloc[school_index.within(property_lat, property_lon, radius)]
+        df_listings = df_listings.iloc[listing_index.within(property_lat, property_lon, radius)]
+
+    # Fit the view to the property polygons, the points shown and the property itself
+    box = bounds(
+        np.concatenate([outer_rings[:, 1], df_schools['latitude'], df_listings['latitude'], [property_lat]]),
+        np.concatenate([outer_rings[:, 0], df_schools['longitude'], df_listings['longitude'], [property_lon]]),
+    )
+    center_lat, center_lon = centre(box)
+    zoom = fit_zoom(box, width=width, height=height)
+
+    # Detail finer than a pixel at the initial zoom is never seen
+    tolerance = zoom_tolerance(zoom, center_lat)
+    decimals = quantise_decimals(tolerance)
+
+    # Create a PyDeck layer for the polygons, holes included
+    polygon_layer = pdk.Layer(
+        'PolygonLayer',
+        data=[{
+            'polygon': [simplify_ring(ring, tolerance).round(decimals).tolist() for ring in polygon],
+            'name': 'Property Boundary'
+        } for polygon in polygons],
+        get_polygon='polygon',
+        pickable=True,
+        stroked=True,
+        filled=True,
+        extruded=False,
+        wireframe=True,
+        get_fill_color='[255, 0, 0, 100]',
+        get_line_color='[255, 0, 0, 255]',
+    )
+
+    # Create a ScatterplotLayer for schools
+    schools_layer = pdk.Layer(
+        'ScatterplotLayer',
+        data=_point_records(df_schools, decimals),
+        get_position='position',
+        get_radius=100,  # Adjust the radius size as needed
+        get_fill_color='[0, 0, 255, 160]',  # Blue color with transparency
+        pickable=True,
+        auto_highlight=True,
+    )
+
+    # Create a ScatterplotLayer for sale listings
+    listings_layer = pdk.Layer(
+        'ScatterplotLayer',
+        data=_point_records(df_listings, decimals),
+        get_position='position',
+        get_radius=60,
+        get_fill_color='[0, 160, 0, 200]',  # Green
+        pickable=True,
+        auto_highlight=True,
+    )
+
+    # Create a ScatterplotLayer for the property location (red dot)
+    house_layer = pdk.Layer(
+        'ScatterplotLayer',
+        data=[{'position': [round(property_lon, decimals), round(property_lat, decimals)]}],
+        get_position='position',
+        get_radius=150,  # Adjust the radius size as needed
+        get_fill_color='[255, 0, 0, 255]',  # Red color
+        pickable=False,
+    )
+
+    # Update tooltip to include school info
+    tooltip = {
+        "html": "<b>{name}</b><br/>Type: {types}<br/>Distance: {distance_in_metres}m",
+        "style": {
+            "backgroundColor": "steelblue",
+            "color": "white"
+        }
+    }
+
+    view_state = pdk.ViewState(
+        longitude=center_lon,
+        latitude=center_lat,
+        zoom=zoom,
+        pitch=0,
+    )
+
+    return pdk.Deck(
+        layers=[polygon_layer, schools_layer, listings_layer, house_layer],
+        initial_view_state=view_state,
+        tooltip=tooltip
+    )
+
+
+def payload_bytes(deck):
+    """Size of the deck JSON the browser receives."""
+    return len(deck.to_json().encode('utf-8'))
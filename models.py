@@ -0,0 +1,303 @@
+from dataclasses import dataclass
+
+SCHOOL_CATEGORIES = [
+    'nursery', 'primary', 'secondary', 'post_16', 'all_through',
+    'pupil_referral_units', 'special', 'independent'
+]
+
+
+class MissingField(KeyError):
+    """Raised when a field the dashboard needs is absent from a response."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.path = path
+
+    def __str__(self):
+        return f"missing field `{self.path}`"
+
+
+def _join(path, key):
+    if isinstance(key, int):
+        return f"{path}[{key}]"
+    return f"{path}.{key}" if path else key
+
+
+def _get(node, path, *keys):
+    """Walk ``keys`` down from ``node``, naming the full path if one is absent."""
+    for key in keys:
+        path = _join(path, key)
+        try:
+            node = node[key]
+        except (KeyError, IndexError, TypeError):
+            raise MissingField(path) from None
+    return node
+
+
+@dataclass(slots=True, frozen=True)
+class Transaction:
+    date: str
+    price: float
+    property_type: str
+    transaction_id: str
+
+    @classmethod
+    def from_dict(cls, raw, path):
+        return cls(
+            date=_get(raw, path, 'date'),
+            price=_get(raw, path, 'price'),
+            property_type=raw.get('property_type'),
+            transaction_id=raw.get('transaction_id'),
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class EstimatedValue:
+    year: int
+    month: int
+    estimated_market_value: float
+
+    @classmethod
+    def from_dict(cls, raw, path):
+        return cls(
+            year=_get(raw, path, 'year'),
+            month=_get(raw, path, 'month'),
+            estimated_market_value=_get(raw, path, 'estimated_market_value'),
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class School:
+    name: str
+    category: str
+    latitude: float
+    longitude: float
+    types: str
+    distance_in_metres: float
+
+    @classmethod
+    def from_dict(cls, raw, path, category):
+        return cls(
+            name=raw.get('name', 'Unknown'),
+            category=category,
+            latitude=_get(raw, path, 'location', 'coordinates', 'latitude'),
+            longitude=_get(raw, path, 'location', 'coordinates', 'longitude'),
+            types=', '.join(raw.get('school_types', [])),
+            distance_in_metres=raw.get('distance_in_metres', 0),
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class Listing:
+    address: str
+    listing_type: str
+    listed_date: str
+    number_of_bedrooms: int
+    status: str
+    price: float
+    main_image_url: str
+    latitude: float
+    longitude: float
+    distance_in_metres: float
+
+    @classmethod
+    def from_dict(cls, raw, path):
+        address = _get(raw, path, 'address', 'royal_mail_format')
+        coordinates = (raw.get('location') or {}).get('coordinates') or {}
+        return cls(
+            address=address.get('thoroughfare', 'N/A'),
+            listing_type=(raw.get('listing_type') or 'N/A').capitalize(),
+            listed_date=raw.get('listed_date', 'N/A'),
+            number_of_bedrooms=raw.get('number_of_bedrooms', 'N/A'),
+            status=raw.get('status', 'N/A'),
+            price=raw.get('price'),
+            main_image_url=raw.get('main_image_url'),
+            latitude=coordinates.get('latitude'),
+            longitude=coordinates.get('longitude'),
+            distance_in_metres=raw.get('distance_in_metres'),
+        )
+
+
+class Property:
+    """Read-only view over one Street Data properties/addresses response.
+
+    Scalar fields are read straight from the response on access; list
+    sections (transactions, estimated values, schools, listings) are parsed
+    into records the first time a section asks for them and kept. Any field
+    that is absent raises ``MissingField`` naming its path.
+    """
+
+    __slots__ = ('raw', 'attributes', '_parsed')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.attributes = _get(raw, '', 'data', 'attributes')
+        self._parsed = {}
+
+    def field(self, *keys):
+        return _get(self.attributes, 'attributes', *keys)
+
+    def get(self, name, default=None):
+        """Return attribute ``name`` of this object, or ``default`` if missing."""
+        try:
+            return getattr(self, name)
+        except MissingField:
+            return default
+
+    def _lazy(self, name, build):
+        if name not in self._parsed:
+            self._parsed[name] = build()
+        return self._parsed[name]
+
+    # Overview
+
+    @property
+    def address_lines(self):
+        return self.field('address', 'street_group_format', 'address_lines')
+
+    @property
+    def property_type(self):
+        return self.field('property_type', 'value')
+
+    @property
+    def year_built(self):
+        return self.field('year_built', 'value')
+
+    @property
+    def council_tax_band(self):
+        return self.field('council_tax', 'band')
+
+    @property
+    def council_tax_charge(self):
+        return self.field('council_tax', 'current_annual_charge')
+
+    @property
+    def class_of_title(self):
+        return self.field('title_deeds', 'titles', 0, 'class_of_title')
+
+    @property
+    def plot_area(self):
+        return self.field('plot', 'total_plot_area_square_metres')
+
+    @property
+    def outdoor_space_area(self):
+        return self.field('outdoor_space', 'outdoor_space_area_square_metres')
+
+    @property
+    def bedrooms(self):
+        return self.field('number_of_bedrooms', 'value')
+
+    @property
+    def bathrooms(self):
+        return self.field('number_of_bathrooms', 'value')
+
+    @property
+    def location(self):
+        """(latitude, longitude) of the property itself."""
+        coordinates = self.field('location', 'coordinates')
+        return (
+            _get(coordinates, 'attributes.location.coordinates', 'latitude'),
+            _get(coordinates, 'attributes.location.coordinates', 'longitude'),
+        )
+
+    # Energy and value estimates
+
+    @property
+    def epc_current_rating(self):
+        return self.field('energy_performance', 'energy_efficiency', 'current_rating')
+
+    @property
+    def epc_potential_rating(self):
+        return self.field('energy_performance', 'energy_efficiency', 'potential_rating')
+
+    @property
+    def epc_current_efficiency(self):
+        return self.field('energy_performance', 'energy_efficiency', 'current_efficiency')
+
+    @property
+    def epc_potential_efficiency(self):
+        return self.field('energy_performance', 'energy_efficiency', 'potential_efficiency')
+
+    @property
+    def environmental_impact(self):
+        return self.field('energy_performance', 'environmental_impact', 'current_impact')
+
+    @property
+    def monthly_rental_value(self):
+        return self.field('estimated_rental_value', 'estimated_monthly_rental_value')
+
+    @property
+    def annual_rental_yield(self):
+        return self.field('estimated_rental_value', 'estimated_annual_rental_yield')
+
+    # Heavy sections, parsed on first use
+
+    @property
+    def transactions(self):
+        def build():
+            raw = self.attributes.get('transactions') or []
+            return [Transaction.from_dict(item, f'attributes.transactions[{i}]') for i, item in enumerate(raw)]
+        return self._lazy('transactions', build)
+
+    @property
+    def estimated_values(self):
+        def build():
+            raw = self.field('estimated_values')
+            return [EstimatedValue.from_dict(item, f'attributes.estimated_values[{i}]') for i, item in enumerate(raw)]
+        return self._lazy('estimated_values', build)
+
+    @property
+    def latest_estimated_value(self):
+        if not self.estimated_values:
+            raise MissingField('attributes.estimated_values[0]')
+        return max(self.estimated_values, key=lambda value: (value.year, value.month))
+
+    @property
+    def schools(self):
+        def build():
+            education = self.field('education')
+            schools = []
+            for category in SCHOOL_CATEGORIES:
+                for i, school in enumerate(education.get(category) or []):
+                    schools.append(School.from_dict(school, f'attributes.education.{category}[{i}]', category))
+            return schools
+        return self._lazy('schools', build)
+
+    @property
+    def title_polygons(self):
+        """Every polygon of every title, each a list of [lon, lat] rings."""
+        def build():
+            polygons = []
+            titles = self.field('title_deeds', 'titles')
+            for t, title in enumerate(titles):
+                for p, polygon in enumerate(title.get('polygons') or []):
+                    path = f'attributes.title_deeds.titles[{t}].polygons[{p}]'
+                    polygons.append(_get(polygon, path, 'epsg_4326_polygon', 'coordinates'))
+            return polygons
+        return self._lazy('title_polygons', build)
+
+    @property
+    def outcode_statistics(self):
+        return self.field('market_statistics', 'outcode')
+
+    @property
+    def sales_monthly(self):
+        return _get(self.outcode_statistics, 'attributes.market_statistics.outcode', 'sales_monthly')
+
+    @property
+    def sales_price_bracket(self):
+        return _get(self.outcode_statistics, 'attributes.market_statistics.outcode', 'sales_price_bracket')
+
+    @property
+    def sale_listings(self):
+        def build():
+            raw = self.field('nearby_listings', 'sale_listings') or []
+            return [Listing.from_dict(item, f'attributes.nearby_listings.sale_listings[{i}]') for i, item in enumerate(raw)]
+        return self._lazy('sale_listings', build)
+
+    @property
+    def completed_listings(self):
+        def build():
+            raw = self.field('nearby_completed_transactions') or []
+            return [Listing.from_dict(item, f'attributes.nearby_completed_transactions[{i}]') for i, item in enumerate(raw)]
+        return self._lazy('completed_listings', build)
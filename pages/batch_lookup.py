@@ -0,0 +1,75 @@
+import time
+
+import pandas as pd
+import streamlit as st
+
+from batch import SUMMARY_COLUMNS, SUMMARY_SECTIONS, fetch_many, read_portfolio, summarise
+from lookup import cached_lookup, get_data_source, get_outcode_cache, get_property_store, get_response_cache
+
+st.title("📋 Portfolio Batch Lookup")
+st.markdown("Upload a CSV with `address` and `postcode` columns to look up every property in it.")
+
+uploaded = st.file_uploader("Portfolio CSV", type="csv")
+col1, col2 = st.columns(2)
+with col1:
+    max_workers = st.slider("Concurrent requests", min_value=1, max_value=16, value=8)
+with col2:
+    rate_per_second = st.number_input("Rate limit (requests per second)", min_value=0.5, max_value=50.0, value=5.0, step=0.5)
+
+if uploaded is not None and st.button("Run batch"):
+    try:
+        portfolio = read_portfolio(uploaded)
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+
+    rows = list(portfolio.itertuples(index=False, name=None))
+    cache = get_response_cache()
+    source = get_data_source()
+    store = get_property_store()
+    statistics = get_outcode_cache()
+    summary = [None] * len(rows)
+
+    # Anything already cached is summarised straight away and never
+    # counts against the rate limit
+    misses = []
+    for index, (address, postcode) in enumerate(rows):
+        data = cache.get(address, postcode, sections=SUMMARY_SECTIONS) if source.cacheable else None
+        if data is not None:
+            summary[index] = summarise(address, postcode, data)
+        else:
+            misses.append(index)
+
+    progress = st.progress(0.0, text=f"{len(rows) - len(misses)} of {len(rows)} served from cache")
+    table = st.empty()
+    started = time.perf_counter()
+    done = len(rows) - len(misses)
+
+    fetched = fetch_many(
+        [rows[index] for index in misses],
+        lambda address, postcode: cached_lookup(
+            cache, source, address, postcode, store=store, statistics=statistics, sections=SUMMARY_SECTIONS,
+        ),
+        max_workers=max_workers,
+        rate_per_second=rate_per_second,
+    )
+    for position, data, error in fetched:
+        index = misses[position]
+        summary[index] = summarise(*rows[index], data=data, error=error)
+        done += 1
+        elapsed = time.perf_counter() - started
+        progress.progress(done / len(rows), text=f"{done} of {len(rows)} looked up ({elapsed:.1f}s)")
+        if done % 10 == 0 or done == len(rows):
+            table.dataframe(pd.DataFrame([row for row in summary if row is not None]), use_container_width=True)
+
+    df_summary = pd.DataFrame(summary, columns=SUMMARY_COLUMNS)
+    table.dataframe(df_summary, use_container_width=True)
+    failures = df_summary["error"].notna().sum()
+    if failures:
+        st.warning(f"{failures} of {len(rows)} lookups failed; see the error column.")
+    st.download_button(
+        "Download summary CSV",
+        df_summary.to_csv(index=False),
+        file_name="portfolio_summary.csv",
+        mime="text/csv",
+    )
@@ -0,0 +1,71 @@
+import pandas as pd
+import streamlit as st
+
+from batch import read_portfolio
+from lookup import get_data_source, get_prefetch_scheduler, get_watchlist, setting
+
+st.title("👀 Watchlist")
+st.markdown(
+    "Watched addresses are looked up ahead of time, during `PREFETCH_WINDOW`, "
+    "so the dashboard can serve them straight from the cache."
+)
+
+watchlist = get_watchlist()
+scheduler = get_prefetch_scheduler()
+if not get_data_source().cacheable:
+    st.warning("The current data source isn't cached, so prefetching won't speed anything up.")
+
+col1, col2 = st.columns(2)
+with col1:
+    address = st.text_input("Address")
+with col2:
+    postcode = st.text_input("Postcode")
+col1, col2 = st.columns(2)
+with col1:
+    if st.button("Watch") and address and postcode:
+        watchlist.add(address, postcode)
+with col2:
+    if st.button("Stop watching") and address and postcode:
+        watchlist.remove(address, postcode)
+
+uploaded = st.file_uploader("Add addresses from a CSV with `address` and `postcode` columns", type="csv")
+if uploaded is not None and st.button("Add to watchlist"):
+    try:
+        portfolio = read_portfolio(uploaded)
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+    for row_address, row_postcode in portfolio.itertuples(index=False, name=None):
+        watchlist.add(row_address, row_postcode)
+    st.success(f"Added {len(portfolio)} addresses.")
+
+if st.button("Prefetch now"):
+    with st.spinner("Prefetching..."):
+        summary = scheduler.run_once(force=True)
+    st.info(
+        f"{summary['fetched']} fetched, {summary['fresh']} already fresh, {summary['failed']} failed, "
+        f"{summary['backing_off']} waiting to retry."
+    )
+
+window = setting("PREFETCH_WINDOW")
+st.caption(
+    f"Window: {window or 'not set, so only on demand'} · "
+    f"{scheduler.budget_left()} of {scheduler.daily_budget} lookups left today · "
+    f"at most {scheduler.rate_per_second:g} per second"
+)
+
+cost_per_lookup = setting("API_COST_PER_LOOKUP")
+stats = watchlist.stats(float(cost_per_lookup) if cost_per_lookup else None)
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Watched", stats["entries"])
+col2.metric("Hit rate", f"{stats['hit_rate']:.0%}", help=f"{stats['hits']} of {stats['hits'] + stats['misses']} views served by a prefetch")
+col3.metric("Waiting saved", f"{stats['seconds_saved']:.1f} s")
+col4.metric("Unused prefetches", stats["unused_prefetches"])
+if cost_per_lookup:
+    st.caption(f"Prefetch spend: £{stats['prefetch_cost']:,.2f}, of which £{stats['unused_cost']:,.2f} was never viewed")
+
+df = pd.DataFrame(watchlist.entries())
+if not df.empty:
+    for column in ("prefetched_at", "retry_at"):
+        df[column] = pd.to_datetime(df[column], unit="s")
+    st.dataframe(df, use_container_width=True)
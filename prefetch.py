@@ -0,0 +1,294 @@
+"""Watchlist of addresses to keep warm, and an off-peak prefetch scheduler.
+
+    python prefetch.py --add watchlist.csv   # add address/postcode rows
+    python prefetch.py --once                # prefetch now, e.g. from cron
+
+The scheduler runs inside the dashboard when ``PREFETCH_WINDOW`` is set
+(e.g. ``01:00-06:00``, local time). In the window it looks up watched
+addresses whose cached response is no longer fresh, no faster than
+``PREFETCH_RATE`` per second and at most ``PREFETCH_DAILY_BUDGET`` lookups
+a day, and saves them wherever the Submit path reads from. Views of a
+watched address are recorded so the watchlist can report how often a
+prefetch was there when it was needed.
+"""
+import argparse
+import datetime
+import sqlite3
+import threading
+import time
+
+from batch import RateLimiter
+from instrumentation import METRICS, log_event
+from response_cache import cache_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watchlist (
+    key TEXT PRIMARY KEY,
+    address TEXT NOT NULL,
+    postcode TEXT NOT NULL,
+    tier TEXT NOT NULL,
+    added_at REAL NOT NULL,
+    attempted_at REAL,
+    prefetched_at REAL,
+    -- How long the last prefetch took: the wait a warm view is spared
+    fetch_seconds REAL,
+    -- Failed attempts since the last success, and when to try again
+    failed_streak INTEGER NOT NULL DEFAULT 0,
+    retry_at REAL,
+    -- Prefetched and not yet viewed
+    warm INTEGER NOT NULL DEFAULT 0,
+    prefetches INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    seconds_saved REAL NOT NULL DEFAULT 0
+);
+-- One row per lookup, successful or not, for the daily budget
+CREATE TABLE IF NOT EXISTS prefetch_attempts (
+    attempted_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS prefetch_attempts_attempted_at ON prefetch_attempts (attempted_at);
+"""
+
+WATCHLIST_COLUMNS = [
+    "address", "postcode", "tier", "prefetched_at", "fetch_seconds", "prefetches", "failures", "retry_at", "hits",
+    "misses",
+]
+
+DAY = 24 * 60 * 60
+# A failing address is retried after an hour, doubling each time it fails
+# again, up to once a day
+RETRY_FAILED_AFTER = 60 * 60
+MAX_RETRY_AFTER = DAY
+
+
+def parse_window(value):
+    """(start, end) times from ``"HH:MM-HH:MM"``; the window may wrap past midnight."""
+    try:
+        start, end = (datetime.time.fromisoformat(part.strip()) for part in value.split("-"))
+    except ValueError:
+        raise ValueError(f"PREFETCH_WINDOW must look like 01:00-06:00, not {value!r}") from None
+    return start, end
+
+
+def in_window(window, now):
+    if window is None:
+        return True
+    start, end = window
+    current = now.time()
+    if start <= end:
+        return start <= current < end
+    return current >= start or current < end
+
+
+class Watchlist:
+    """SQLite list of watched addresses with their prefetch and view history."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def add(self, address, postcode, tier="premium"):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO watchlist (key, address, postcode, tier, added_at) VALUES (?, ?, ?, ?, ?)",
+                (cache_key(address, postcode, tier), address.strip(), postcode.strip(), tier, time.time()),
+            )
+
+    def remove(self, address, postcode, tier="premium"):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM watchlist WHERE key = ?", (cache_key(address, postcode, tier),))
+
+    def entries(self):
+        """Watched addresses as dicts, least recently prefetched first."""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT {', '.join(WATCHLIST_COLUMNS)} FROM watchlist "
+                "ORDER BY prefetched_at IS NOT NULL, prefetched_at, added_at"
+            )
+            return [dict(zip(WATCHLIST_COLUMNS, row)) for row in cursor.fetchall()]
+
+    def attempts_since(self, since):
+        """Lookups made since ``since``, counting every retry of the same address."""
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM prefetch_attempts WHERE attempted_at >= ?", (since,)
+            ).fetchone()
+        return count
+
+    def record_prefetch(self, address, postcode, tier, seconds=None, error=None):
+        now = time.time()
+        key = cache_key(address, postcode, tier)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO prefetch_attempts (attempted_at) VALUES (?)", (now,))
+            # Only today's attempts count against the budget
+            self._conn.execute("DELETE FROM prefetch_attempts WHERE attempted_at < ?", (now - 2 * DAY,))
+            if error is None:
+                self._conn.execute(
+                    "UPDATE watchlist SET attempted_at = ?, prefetched_at = ?, fetch_seconds = ?, warm = 1, "
+                    "prefetches = prefetches + 1, failed_streak = 0, retry_at = NULL WHERE key = ?",
+                    (now, now, seconds, key),
+                )
+            else:
+                row = self._conn.execute("SELECT failed_streak FROM watchlist WHERE key = ?", (key,)).fetchone()
+                streak = row[0] if row is not None else 0
+                retry_at = now + min(RETRY_FAILED_AFTER * 2 ** streak, MAX_RETRY_AFTER)
+                self._conn.execute(
+                    "UPDATE watchlist SET attempted_at = ?, failures = failures + 1, failed_streak = failed_streak + 1, "
+                    "retry_at = ? WHERE key = ?",
+                    (now, retry_at, key),
+                )
+
+    def record_view(self, address, postcode, tier="premium", from_cache=False):
+        """Count a dashboard view of a watched address; other addresses are ignored.
+
+        A view served from the cache while a prefetch is still unviewed is
+        a hit, and saves the time that prefetch took. Any other view is a
+        miss.
+        """
+        key = cache_key(address, postcode, tier)
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT warm, fetch_seconds FROM watchlist WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            hit = bool(from_cache and row[0])
+            if hit:
+                self._conn.execute(
+                    "UPDATE watchlist SET warm = 0, hits = hits + 1, seconds_saved = seconds_saved + ? WHERE key = ?",
+                    (row[1] or 0, key),
+                )
+            else:
+                self._conn.execute("UPDATE watchlist SET warm = 0, misses = misses + 1 WHERE key = ?", (key,))
+        METRICS.inc("prefetch_views_total", result="hit" if hit else "miss")
+        return hit
+
+    def stats(self, cost_per_lookup=None):
+        with self._lock:
+            entries, prefetches, failures, hits, misses, seconds_saved = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(prefetches), 0), COALESCE(SUM(failures), 0), COALESCE(SUM(hits), 0), "
+                "COALESCE(SUM(misses), 0), COALESCE(SUM(seconds_saved), 0) FROM watchlist"
+            ).fetchone()
+        views = hits + misses
+        stats = {
+            "entries": entries,
+            "prefetches": prefetches,
+            "failures": failures,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / views if views else 0.0,
+            "seconds_saved": seconds_saved,
+            # Prefetches nobody looked at before the next one replaced them
+            "unused_prefetches": prefetches - hits,
+        }
+        if cost_per_lookup is not None:
+            stats["prefetch_cost"] = prefetches * cost_per_lookup
+            stats["unused_cost"] = stats["unused_prefetches"] * cost_per_lookup
+        return stats
+
+
+class PrefetchScheduler:
+    """Keeps watched addresses fresh in the response cache, within a rate budget.
+
+    ``fetch(address, postcode, tier)`` looks an address up and saves the
+    response; ``fresh(address, postcode, tier)`` says whether the cache
+    would already serve it. Only addresses that aren't fresh are fetched.
+    """
+
+    def __init__(self, watchlist, fetch, fresh, rate_per_second=0.5, daily_budget=200, window=None):
+        self.watchlist = watchlist
+        self.fetch = fetch
+        self.fresh = fresh
+        self.rate_per_second = rate_per_second
+        self.daily_budget = daily_budget
+        self.window = window
+        self._stop = threading.Event()
+        self._running = threading.Lock()
+
+    def budget_left(self, now=None):
+        now = now or datetime.datetime.now()
+        midnight = datetime.datetime.combine(now.date(), datetime.time()).timestamp()
+        return max(0, self.daily_budget - self.watchlist.attempts_since(midnight))
+
+    def run_once(self, now=None, force=False):
+        """Prefetch whatever is due; ``force`` ignores the window but not the budget.
+
+        Returns counts of addresses fetched, already fresh, failed and
+        skipped while backing off from an earlier failure.
+        """
+        summary = {"fetched": 0, "fresh": 0, "failed": 0, "backing_off": 0}
+        now = now or datetime.datetime.now()
+        if not force and not in_window(self.window, now):
+            return summary
+        # One run at a time, whether from the thread or a button
+        if not self._running.acquire(blocking=False):
+            return summary
+        try:
+            budget = self.budget_left(now)
+            limiter = RateLimiter(self.rate_per_second)
+            for entry in self.watchlist.entries():
+                if self._stop.is_set() or budget <= 0:
+                    break
+                address, postcode, tier = entry["address"], entry["postcode"], entry["tier"]
+                if entry["retry_at"] is not None and entry["retry_at"] > time.time():
+                    # Failed recently; retrying straight away would only burn budget
+                    summary["backing_off"] += 1
+                    continue
+                if self.fresh(address, postcode, tier):
+                    summary["fresh"] += 1
+                    continue
+                limiter.acquire()
+                budget -= 1
+                started = time.perf_counter()
+                try:
+                    self.fetch(address, postcode, tier)
+                except Exception as e:
+                    # The lookup may well have been paid for even if saving it
+                    # failed, so it counts against the budget either way
+                    self.watchlist.record_prefetch(address, postcode, tier, error=e)
+                    log_event("prefetch_failed", address=address, postcode=postcode, error=f"{type(e).__name__}: {e}")
+                    summary["failed"] += 1
+                    continue
+                self.watchlist.record_prefetch(address, postcode, tier, seconds=time.perf_counter() - started)
+                summary["fetched"] += 1
+        finally:
+            self._running.release()
+        METRICS.inc("prefetch_lookups_total", summary["fetched"], result="fetched")
+        METRICS.inc("prefetch_lookups_total", summary["failed"], result="failed")
+        log_event("prefetch_run", **summary)
+        return summary
+
+    def start(self, interval=300):
+        """Check for due addresses every ``interval`` seconds from a daemon thread."""
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.run_once()
+                except Exception as e:
+                    log_event("prefetch_failed", error=f"{type(e).__name__}: {e}")
+
+        threading.Thread(target=run, daemon=True, name="prefetch").start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+if __name__ == "__main__":
+    from batch import read_portfolio
+    from instrumentation import configure_logging
+    from lookup import get_prefetch_scheduler, get_watchlist
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--add", metavar="CSV", help="add the address/postcode rows of a CSV to the watchlist")
+    parser.add_argument("--once", action="store_true", help="prefetch due addresses now, ignoring the window")
+    args = parser.parse_args()
+    configure_logging()
+
+    if args.add:
+        for address, postcode in read_portfolio(args.add).itertuples(index=False, name=None):
+            get_watchlist().add(address, postcode)
+    if args.once:
+        print(get_prefetch_scheduler().run_once(force=True))
+    print(get_watchlist().stats())
@@ -0,0 +1,191 @@
+import datetime
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from response_cache import cache_key, normalise_address, normalise_postcode, outcode
+
+SCHEMA = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+
+CREATE TABLE IF NOT EXISTS properties (
+    key TEXT PRIMARY KEY,
+    address TEXT,
+    postcode TEXT,
+    outcode TEXT,
+    property_type TEXT,
+    latitude REAL,
+    longitude REAL,
+    fetched_at REAL
+);
+CREATE INDEX IF NOT EXISTS properties_outcode ON properties (outcode);
+
+-- Sales of the property itself and nearby completed sales, one row per sale
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    outcode TEXT NOT NULL,
+    postcode TEXT,
+    address TEXT,
+    date TEXT NOT NULL,
+    price INTEGER NOT NULL,
+    property_type TEXT,
+    bedrooms INTEGER
+);
+-- The de-duplicating index doubles as the (outcode, date) index for comparables
+CREATE UNIQUE INDEX IF NOT EXISTS transactions_unique ON transactions (outcode, date, price, address);
+CREATE INDEX IF NOT EXISTS transactions_outcode_type_date ON transactions (outcode, property_type, date);
+CREATE INDEX IF NOT EXISTS transactions_postcode_date ON transactions (postcode, date);
+
+CREATE TABLE IF NOT EXISTS estimated_values (
+    property_key TEXT NOT NULL,
+    month TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (property_key, month)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS outcode_sales_monthly (
+    outcode TEXT NOT NULL,
+    month TEXT NOT NULL,
+    average_price INTEGER,
+    count_of_sales INTEGER,
+    PRIMARY KEY (outcode, month)
+) WITHOUT ROWID;
+"""
+
+
+def _month(year, month):
+    return f"{int(year):04d}-{int(month):02d}"
+
+
+def _cutoff(months):
+    today = datetime.date.today()
+    year, month = divmod(today.year * 12 + today.month - 1 - months, 12)
+    return datetime.date(year, month + 1, 1).isoformat()
+
+
+def _nearby_sale(raw, fallback_outcode):
+    """Transaction row for one nearby completed sale, or None if it has no date or price."""
+    address = (raw.get('address') or {}).get('royal_mail_format') or {}
+    date = raw.get('transaction_date') or raw.get('completed_date') or raw.get('listed_date')
+    price = raw.get('price')
+    if not date or price is None:
+        return None
+    postcode = address.get('postcode')
+    street = ' '.join(str(part) for part in (address.get('building_number'), address.get('thoroughfare')) if part)
+    return (
+        'nearby', outcode(postcode) if postcode else fallback_outcode, normalise_postcode(postcode) or None,
+        # '' rather than NULL: the unique index treats NULLs as distinct, so
+        # sales without an address would be stored again on every ingest
+        normalise_address(street), str(date)[:10], int(price), raw.get('property_type'), raw.get('number_of_bedrooms'),
+    )
+
+
+class PropertyStore:
+    """SQLite store of every fetched response, for comparables queries.
+
+    Transactions are indexed by outcode, property type and date so the
+    comparables and price bracket queries stay index range scans however
+    many rows accumulate. Ingesting the same response twice is harmless.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def ingest(self, address, postcode, data, tier="premium"):
+        attributes = data['data']['attributes']
+        key = cache_key(address, postcode, tier)
+        area = outcode(postcode)
+        coordinates = (attributes.get('location') or {}).get('coordinates') or {}
+        property_type = (attributes.get('property_type') or {}).get('value')
+
+        sales = [
+            # Normalised like the cache key, so another spelling of the address
+            # doesn't store the same sales again
+            ('property', area, normalise_postcode(postcode), normalise_address(address), str(sale['date'])[:10],
+             int(sale['price']),
+             sale.get('property_type') or property_type, (attributes.get('number_of_bedrooms') or {}).get('value'))
+            for sale in attributes.get('transactions') or []
+            if sale.get('date') and sale.get('price') is not None
+        ]
+        nearby = (_nearby_sale(raw, area) for raw in attributes.get('nearby_completed_transactions') or [])
+        sales += [row for row in nearby if row is not None]
+        values = [
+            (key, _month(value['year'], value['month']), int(value['estimated_market_value']))
+            for value in attributes.get('estimated_values') or []
+            if None not in (value.get('year'), value.get('month'), value.get('estimated_market_value'))
+        ]
+        sales_monthly = [
+            (area, _month(row['year'], row['month']), row.get('average_price'), row.get('count_of_sales'))
+            for row in ((attributes.get('market_statistics') or {}).get('outcode') or {}).get('sales_monthly') or []
+            if row.get('year') is not None and row.get('month') is not None
+        ]
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO properties VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, address, normalise_postcode(postcode), area, property_type,
+                 coordinates.get('latitude'), coordinates.get('longitude'), time.time()),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO transactions "
+                "(source, outcode, postcode, address, date, price, property_type, bedrooms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                sales,
+            )
+            self._conn.executemany("INSERT OR REPLACE INTO estimated_values VALUES (?, ?, ?)", values)
+            self._conn.executemany("INSERT OR REPLACE INTO outcode_sales_monthly VALUES (?, ?, ?, ?)", sales_monthly)
+
+    def _query(self, sql, params):
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    def comparable_sales(self, area, months=12, property_type=None, limit=500):
+        """Sales in an outcode over the last ``months`` months, newest first."""
+        sql = "SELECT date, price, property_type, bedrooms, address, postcode, source FROM transactions " \
+              "WHERE outcode = ? AND date >= ?"
+        params = [area, _cutoff(months)]
+        if property_type:
+            sql += " AND property_type = ?"
+            params.append(property_type)
+        sql += " ORDER BY date DESC LIMIT ?"
+        params.append(limit)
+        return self._query(sql, params)
+
+    def price_bracket_distribution(self, area, months=12, bracket=50_000, property_type=None):
+        """Count of sales per ``bracket``-wide price band in an outcode."""
+        sql = "SELECT (price / ?) * ? AS bracket_floor, COUNT(*) AS count_of_sales FROM transactions " \
+              "WHERE outcode = ? AND date >= ?"
+        params = [bracket, bracket, area, _cutoff(months)]
+        if property_type:
+            sql += " AND property_type = ?"
+            params.append(property_type)
+        sql += " GROUP BY bracket_floor ORDER BY bracket_floor"
+        df = self._query(sql, params)
+        df['price_bracket_name'] = [f"£{low // 1000:,}k-£{(low + bracket) // 1000:,}k" for low in df['bracket_floor']]
+        return df
+
+    def property_types(self, area):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT property_type FROM transactions WHERE outcode = ? AND property_type IS NOT NULL "
+                "ORDER BY property_type", (area,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self):
+        with self._lock:
+            counts = {
+                table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("properties", "transactions", "estimated_values", "outcode_sales_monthly")
+            }
+            page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        counts["bytes"] = page_count * page_size
+        return counts
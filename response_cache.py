@@ -0,0 +1,373 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+DAY = 24 * 60 * 60
+
+# How long each part of a Street Data response stays fresh. Listings and
+# market figures move quickly, the building itself hardly ever changes.
+SECTION_TTLS = {
+    "nearby_listings": 1 * DAY,
+    "nearby_completed_transactions": 7 * DAY,
+    "market_statistics": 7 * DAY,
+    "estimated_values": 30 * DAY,
+    "estimated_rental_value": 30 * DAY,
+    "transactions": 30 * DAY,
+}
+DEFAULT_TTL = 90 * DAY
+
+
+def normalise_address(address):
+    address = re.sub(r"[,.;]", " ", address or "")
+    return " ".join(address.lower().split())
+
+
+def normalise_postcode(postcode):
+    return "".join((postcode or "").upper().split())
+
+
+def outcode(postcode):
+    """Outward half of a UK postcode; the inward half is always three characters."""
+    postcode = normalise_postcode(postcode)
+    return postcode[:-3] if len(postcode) > 3 else postcode
+
+
+def cache_key(address, postcode, tier="premium"):
+    return f"{tier}|{normalise_postcode(postcode)}|{normalise_address(address)}"
+
+
+def section_ttl(section):
+    return SECTION_TTLS.get(section, DEFAULT_TTL)
+
+
+def _attributes(body):
+    try:
+        return body["data"]["attributes"]
+    except (KeyError, TypeError):
+        return {}
+
+
+def _expires_at(body, fetched_at, sections=None):
+    if sections is None:
+        sections = _attributes(body).keys()
+    ttls = [section_ttl(section) for section in sections]
+    return fetched_at + min(ttls, default=DEFAULT_TTL)
+
+
+def _purge_at(body, fetched_at):
+    # Kept on disk until no section is fresh any more, so callers that only
+    # need the slow-moving sections can still be served.
+    ttls = [section_ttl(section) for section in _attributes(body)]
+    return fetched_at + max(ttls, default=DEFAULT_TTL)
+
+
+class ResponseCache:
+    """Two level (memory + SQLite) LRU cache of Street Data responses.
+
+    Entries are keyed on the normalised address, postcode and tier. An entry
+    is fresh while every section the caller needs is younger than its TTL
+    in ``SECTION_TTLS``; by default that is every section in the response.
+    """
+
+    def __init__(self, path, max_memory_entries=128, max_disk_entries=5000):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                fetched_at REAL NOT NULL,
+                purge_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+            CREATE INDEX IF NOT EXISTS responses_purge_at ON responses (purge_at);
+            """
+        )
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "writes": 0,
+            "evictions": 0,
+        }
+
+    def get(self, address, postcode, tier="premium", sections=None):
+        """Return the cached response, or None if missing or stale."""
+        entry = self.get_entry(address, postcode, tier, sections)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, address, postcode, tier="premium", sections=None):
+        """(response, fetched_at) like ``get``; ``fetched_at`` tells versions of a response apart."""
+        key = cache_key(address, postcode, tier)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                body, fetched_at = entry
+                if _expires_at(body, fetched_at, sections) > now:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return entry
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+
+            row = self._conn.execute(
+                "SELECT body, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            body = json.loads(zlib.decompress(row[0]))
+            fetched_at = row[1]
+            if _expires_at(body, fetched_at, sections) <= now:
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self._remember(key, body, fetched_at)
+            self.counters["disk_hits"] += 1
+            return body, fetched_at
+
+    def fresh(self, address, postcode, tier="premium", sections=None):
+        """Whether ``get`` would hit, without counting it or refreshing its LRU position."""
+        key = cache_key(address, postcode, tier)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                row = self._conn.execute(
+                    "SELECT body, fetched_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return False
+                entry = (json.loads(zlib.decompress(row[0])), row[1])
+        return _expires_at(*entry, sections) > time.time()
+
+    def put(self, address, postcode, body, tier="premium", fetched_at=None):
+        key = cache_key(address, postcode, tier)
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        blob = zlib.compress(json.dumps(body, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, fetched_at, purge_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, blob, fetched_at, _purge_at(body, fetched_at), time.time()),
+            )
+            self._evict_disk()
+            self._conn.commit()
+            self._remember(key, body, fetched_at)
+            self.counters["writes"] += 1
+
+    def stats(self):
+        with self._lock:
+            disk_entries, disk_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM responses"
+            ).fetchone()
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = disk_entries
+            stats["disk_bytes"] = disk_bytes
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def _remember(self, key, body, fetched_at):
+        self._memory[key] = (body, fetched_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _evict_disk(self):
+        self._conn.execute("DELETE FROM responses WHERE purge_at <= ?", (time.time(),))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                (overflow,),
+            )
+            self.counters["evictions"] += overflow
+
+
+def split_outcode_statistics(body):
+    """Return (body without market_statistics.outcode, the outcode statistics).
+
+    The body is copied only along the path that changes, so the original
+    is left untouched.
+    """
+    attributes = _attributes(body)
+    market = attributes.get("market_statistics")
+    if not isinstance(market, dict) or "outcode" not in market:
+        return body, None
+    market = dict(market)
+    statistics = market.pop("outcode")
+    attributes = dict(attributes)
+    if market:
+        attributes["market_statistics"] = market
+    else:
+        del attributes["market_statistics"]
+    return dict(body, data=dict(body["data"], attributes=attributes)), statistics
+
+
+def join_outcode_statistics(body, statistics):
+    """Inverse of ``split_outcode_statistics``; a body that has its own statistics wins."""
+    attributes = _attributes(body)
+    market = attributes.get("market_statistics") or {}
+    if statistics is None or "data" not in body or "outcode" in market:
+        return body
+    attributes = dict(attributes, market_statistics=dict(market, outcode=statistics))
+    return dict(body, data=dict(body["data"], attributes=attributes))
+
+
+class OutcodeCache:
+    """Memory + SQLite cache of outcode market statistics.
+
+    ``market_statistics.outcode`` is the same for every address in an
+    outcode, so it is stored once per outcode here instead of once per
+    response. An entry is due for refresh ``refresh_after`` seconds after
+    it was fetched but is still served until a newer copy arrives; each
+    entry remembers the last address seen in its outcode so a scheduled
+    refresh knows what to look up.
+    """
+
+    def __init__(self, path, refresh_after=SECTION_TTLS["market_statistics"], retry_after=DAY,
+                 max_memory_entries=512):
+        self.path = path
+        self.refresh_after = refresh_after
+        self.retry_after = retry_after
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS outcode_statistics (
+                outcode TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                fetched_at REAL NOT NULL,
+                address TEXT NOT NULL,
+                postcode TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS outcode_statistics_fetched_at ON outcode_statistics (fetched_at);
+            -- Last refresh attempt per outcode, so one that failed or came
+            -- back without statistics isn't retried on every run
+            CREATE TABLE IF NOT EXISTS outcode_refresh_attempts (
+                outcode TEXT PRIMARY KEY,
+                attempted_at REAL NOT NULL
+            );
+            """
+        )
+        self.counters = {"hits": 0, "misses": 0, "writes": 0, "bytes_deduplicated": 0}
+
+    def get(self, area):
+        """Return (statistics, fetched_at) for an outcode, or (None, None)."""
+        with self._lock:
+            entry = self._memory.get(area)
+            if entry is None:
+                row = self._conn.execute(
+                    "SELECT body, fetched_at FROM outcode_statistics WHERE outcode = ?", (area,)
+                ).fetchone()
+                if row is not None:
+                    entry = (json.loads(zlib.decompress(row[0])), row[1])
+                    self._remember(area, entry)
+            else:
+                self._memory.move_to_end(area)
+        return entry if entry is not None else (None, None)
+
+    def put(self, address, postcode, statistics, fetched_at=None):
+        area = outcode(postcode)
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        blob = json.dumps(statistics, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO outcode_statistics (outcode, body, fetched_at, address, postcode) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (area, zlib.compress(blob), fetched_at, address, postcode),
+            )
+            self._conn.commit()
+            self._remember(area, (statistics, fetched_at))
+            self.counters["writes"] += 1
+            # Bytes kept out of the per-property responses
+            self.counters["bytes_deduplicated"] += len(blob)
+
+    def strip(self, address, postcode, body):
+        """Move a response's outcode statistics into the cache and return the rest."""
+        stripped, statistics = split_outcode_statistics(body)
+        if statistics is not None:
+            self.put(address, postcode, statistics)
+        return stripped
+
+    def join(self, postcode, body):
+        """Fill in a stripped response from the cache."""
+        statistics, _ = self.get(outcode(postcode))
+        with self._lock:
+            self.counters["hits" if statistics is not None else "misses"] += 1
+        return join_outcode_statistics(body, statistics)
+
+    def due(self, limit=10):
+        """(outcode, address, postcode) of the stalest entries needing a refresh.
+
+        An outcode attempted in the last ``retry_after`` seconds is left
+        out, whether or not that attempt refreshed it.
+        """
+        now = time.time()
+        with self._lock:
+            return self._conn.execute(
+                "SELECT s.outcode, s.address, s.postcode FROM outcode_statistics s "
+                "LEFT JOIN outcode_refresh_attempts a ON a.outcode = s.outcode "
+                "WHERE s.fetched_at <= ? AND (a.attempted_at IS NULL OR a.attempted_at <= ?) "
+                "ORDER BY s.fetched_at LIMIT ?",
+                (now - self.refresh_after, now - self.retry_after, limit),
+            ).fetchall()
+
+    def attempted(self, area):
+        """Note a refresh attempt for an outcode, successful or not."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO outcode_refresh_attempts (outcode, attempted_at) VALUES (?, ?)",
+                (area, time.time()),
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM outcode_statistics").fetchone()
+            stats = dict(self.counters)
+        stats["entries"] = entries
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM outcode_statistics")
+            self._conn.execute("DELETE FROM outcode_refresh_attempts")
+            self._conn.commit()
+
+    def _remember(self, area, entry):
+        self._memory[area] = entry
+        self._memory.move_to_end(area)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
@@ -1,441 +1,600 @@
-import json
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError, as_completed
+from contextlib import contextmanager
+
 import streamlit as st
-import pydeck as pdk  # Import pydeck for map visualization
-import altair as alt
-import pandas as pd
-import requests
 
-st.title("🏠 Property Data Dashboard")
+from charts import estimated_value_chart, monthly_frame, monthly_sales_chart, price_bracket_chart
+from instrumentation import METRICS, configure_logging, log_event, request_context, serve_metrics, timed
+from listings import (
+    SORT_OPTIONS, TABLE_COLUMNS, card_markdown, filter_listings, listings_frame, listings_page, page_count,
+    sort_listings,
+)
+from lookup import (
+    get_client, get_outcode_cache, get_property_store, get_response_cache, get_thumbnail_cache, get_watchlist,
+    lookup_property_stream, setting, start_outcode_refresh, start_prefetch,
+)
+from map_builder import MAP_HEIGHT, build_map_points, build_property_deck, payload_bytes
+from models import MissingField, Property
+from response_cache import cache_key, outcode
+from street_client import StreetDataError
+from timeseries import RESOLUTIONS, sales_series, value_series
+
+run_started = time.perf_counter()
+configure_logging(setting("LOG_LEVEL", "INFO"))
+
+# Radius filter choices for the map (None is all)
+MAP_RADII = [250, 500, 1000, 2000, 5000, None]
+
+# Listing cards per page of the Nearby Listings grid
+LISTINGS_PAGE_SIZE = 9
+
+# How long a render waits for listing thumbnails before leaving the rest
+# to the next rerun
+THUMBNAIL_WAIT = 8
+
+# Look-back choices, in months, for comparable sales from the local store
+COMPARABLE_MONTHS = [3, 6, 12, 24, 60]
+
+
+@contextmanager
+def section(name):
+    """Time a dashboard section and keep a failure in it from breaking the page."""
+    started = time.perf_counter()
+    try:
+        with request_context(st.session_state.get("request_id")), timed("dashboard_section", section=name):
+            yield
+    except Exception as e:
+        st.error(f"{name} could not be displayed: {type(e).__name__}: {e}")
+    finally:
+        st.session_state.setdefault("render_times", {})[name] = time.perf_counter() - started
 
-# Address and Postcode Input
-col1, col2 = st.columns(2)
-with col1:
-    address = st.text_input("Address")
-with col2:
-    postcode = st.text_input("Postcode")
 
-if st.button("Submit"):
+def unavailable(name, message, e):
+    """Report data a section needs but the response lacks."""
+    METRICS.inc("dashboard_section_failures_total", section=name, exception=type(e).__name__)
+    log_event("section_data_missing", section=name, field=getattr(e, "path", str(e)))
+    st.markdown(f"{message} ({e}).")
+
+
+@st.cache_resource
+def start_metrics_server(port):
+    return serve_metrics(port)
+
+
+def update_cache_gauges(cache_stats):
+    for event in ("memory_hits", "disk_hits", "misses", "expired", "writes", "evictions"):
+        METRICS.set("response_cache_events", cache_stats[event], event=event)
+    METRICS.set("response_cache_entries", cache_stats["memory_entries"], store="memory")
+    METRICS.set("response_cache_entries", cache_stats["disk_entries"], store="disk")
+
+
+def response_key(address, postcode, fetched_at):
+    """The lookup's cache key plus when its response was fetched.
+
+    Refetching an address gives a new key, so nothing derived from the
+    old response is served for the new one.
+    """
+    return f"{cache_key(address, postcode)}@{fetched_at:.6f}"
+
+
+# Everything below is keyed on the response key, so reruns, fragment
+# reruns and other sessions viewing the same response reuse the same work.
+# What the st.cache_resource builders return is shared, not copied, between
+# sessions: callers must not modify it.
+
+@st.cache_resource(max_entries=32)
+def load_property(key, _data):
+    return Property(_data)
+
+
+@st.cache_resource(max_entries=32)
+def estimated_value_series(key, _prop):
+    return monthly_frame(
+        [(value.year, value.month, value.estimated_market_value) for value in _prop.estimated_values],
+        ['year', 'month', 'estimated_market_value'],
+    )
+
+
+@st.cache_data(max_entries=64)
+def estimated_value_spec(key, _prop, resolution="Monthly"):
+    return estimated_value_chart(value_series(estimated_value_series(key, _prop), resolution)).to_dict()
+
+
+# Market statistics are the same for every address in an outcode, so their
+# charts are keyed on the outcode and when its statistics were fetched
+# instead. Every property in a busy outcode then shares one spec.
+
+@st.cache_resource(max_entries=256)
+def sales_monthly_series(area, fetched_at, _prop):
+    return monthly_frame(_prop.sales_monthly, ['year', 'month', 'average_price', 'count_of_sales'])
+
+
+@st.cache_data(max_entries=256)
+def monthly_sales_spec(area, fetched_at, _prop, resolution=None):
+    resolution, df_sales = sales_series(sales_monthly_series(area, fetched_at, _prop), resolution)
+    return monthly_sales_chart(df_sales, title=f'{resolution} Sales and Average Price').to_dict()
+
+
+@st.cache_data(max_entries=256)
+def price_bracket_spec(area, fetched_at, _prop):
+    return price_bracket_chart(_prop.sales_price_bracket).to_dict()
+
+
+@st.cache_resource(max_entries=32)
+def map_points(key, _prop):
+    return build_map_points(_prop)
+
+
+@st.cache_resource(max_entries=64)
+def property_deck(key, _prop, radius=None):
+    deck = build_property_deck(_prop, map_points(key, _prop), radius)
+    return deck, payload_bytes(deck)
+
+
+@st.cache_resource(max_entries=64)
+def listings_table(key, _prop, kind):
+    return listings_frame(_prop.sale_listings if kind == "sale" else _prop.completed_listings)
+
+
+def render_listing_cards(df_listings, show_images=False):
+    num_cols = 3
+    cols = st.columns(num_cols)
+    thumbnails = get_thumbnail_cache() if show_images else None
+    # Image placeholders still waiting on a download, by URL
+    loading = {}
+    for idx, row in enumerate(df_listings.itertuples(index=False)):
+        col = cols[idx % num_cols]
+        with col:
+            if show_images:
+                image = st.empty()
+                url = row.main_image_url
+                thumbnail = thumbnails.get(url) if url else None
+                if thumbnail is not None:
+                    image.image(thumbnail, use_container_width='always')
+                elif url:
+                    image.caption("Loading image…")
+                    loading.setdefault(url, []).append(image)
+                else:
+                    image.write("No image available")
+
+            # One element per card rather than one per line
+            st.markdown(card_markdown(row) + "\n\n---")
+
+    if loading:
+        deferred = st.session_state.get("deferred_thumbnails")
+        if deferred is not None:
+            # Still streaming: waiting on downloads now would hold up the rest of the response
+            deferred.append((thumbnails, loading))
+        else:
+            fill_thumbnails(thumbnails, loading)
+
+
+def listings_browser(name, df_listings, show_images=False):
+    """Filter, sort and page through a listings frame.
+
+    ``name`` keys the widgets, so each browser (and each property) keeps
+    its own filters.
+    """
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        sort = st.selectbox("Sort by", list(SORT_OPTIONS), key=f"{name}_sort")
+    with col2:
+        prices = df_listings['price'].dropna()
+        price_range = None
+        if prices.nunique() > 1:
+            price_range = st.slider(
+                "Price (£)", int(prices.min()), int(prices.max()), (int(prices.min()), int(prices.max())),
+                step=5_000, key=f"{name}_price",
+            )
+    with col3:
+        min_bedrooms = st.selectbox("Bedrooms", [None, 1, 2, 3, 4, 5], key=f"{name}_bedrooms",
+                                    format_func=lambda bedrooms: "Any" if bedrooms is None else f"{bedrooms}+")
+        listed_since = st.date_input("Listed since", value=None, key=f"{name}_listed_since")
+    with col4:
+        max_distance = st.select_slider("Within", options=MAP_RADII, value=None, key=f"{name}_distance",
+                                        format_func=lambda metres: "Any distance" if metres is None else f"{metres:,} m")
+        view = st.radio("View", ["Cards", "Table"], horizontal=True, key=f"{name}_view")
+
+    df_shown = sort_listings(filter_listings(df_listings, price_range, min_bedrooms, listed_since, max_distance), sort)
+    if df_shown.empty:
+        st.write("No listings match these filters.")
+        return
+
+    if view == "Table":
+        # st.dataframe only draws the rows in view, so every match goes in
+        st.dataframe(df_shown[TABLE_COLUMNS], use_container_width=True, hide_index=True)
+        st.caption(f"{len(df_shown)} of {len(df_listings)} listings")
+        return
+
+    pages = page_count(len(df_shown), LISTINGS_PAGE_SIZE)
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, key=f"{name}_page") if pages > 1 else 1
+    page = min(page, pages)
+    render_listing_cards(listings_page(df_shown, page, LISTINGS_PAGE_SIZE), show_images)
+    first, last = (page - 1) * LISTINGS_PAGE_SIZE + 1, min(page * LISTINGS_PAGE_SIZE, len(df_shown))
+    st.caption(f"Showing {first}–{last} of {len(df_shown)} listings ({len(df_listings)} before filters)")
+
+
+def fill_thumbnails(thumbnails, loading):
+    """Swap placeholders for thumbnails as each download finishes, slowest last."""
+    futures = thumbnails.request(loading)
+    for url in loading.keys() - futures.keys():
+        # Fetched by another session meanwhile, or failed recently and not retried yet
+        thumbnail = thumbnails.get(url)
+        for image in loading[url]:
+            if thumbnail is not None:
+                image.image(thumbnail, use_container_width='always')
+            else:
+                image.write("No image available")
+    urls = {future: url for url, future in futures.items()}
     try:
-        # Read local JSON file instead of API call
-        # with open('results.json', 'r', encoding='utf-8') as file:
-            # data = json.load(file)
-        # Make API request
-        url = "https://api.data.street.co.uk/street-data-api/v2/properties/addresses?tier=premium"
-        payload = {
-            "data": {
-                "address": address,
-                "postcode": postcode
-            }
-        }
-        headers = {
-            'Content-Type': 'application/json',
-            'X-Api-Key': st.secrets["DATA_STREET_KEY"]
-        }
-        
-        response = requests.post(url, json=payload, headers=headers)
-        data = response.json()
-
-        # Property Details Section
+        for future in as_completed(urls, timeout=THUMBNAIL_WAIT):
+            thumbnail = future.result()
+            for image in loading[urls[future]]:
+                if thumbnail is not None:
+                    image.image(thumbnail, use_container_width='always')
+                else:
+                    image.write("No image available")
+    except FutureTimeoutError:
+        # Whatever is still downloading is on disk for the next rerun
+        pass
+
+
+# Sections. Each is a fragment, so a widget inside one reruns only that
+# section rather than the whole page.
+
+@st.fragment
+def overview_section(key, prop):
+    with section("Overview"):
         st.header("Property Overview")
         col1, col2 = st.columns(2)
         with col1:
             try:
                 st.subheader("Current Property")
-                st.markdown(f"**Address:** {data['data']['attributes']['address']['street_group_format']['address_lines']}")
-                st.markdown(f"**Property Type:** {data['data']['attributes']['property_type']['value']}")
-                st.markdown(f"**Year Built:** {data['data']['attributes']['year_built']['value']}")
-                st.markdown(f"**Council Tax:** {data['data']['attributes']['council_tax']['band']} - £{data['data']['attributes']['council_tax']['current_annual_charge']}")
-                st.markdown(f"**Deeds:** {data['data']['attributes']['title_deeds']['titles'][0]['class_of_title']}")
-            except:
-                st.markdown("Property details unavailable.")
+                st.markdown(f"**Address:** {prop.address_lines}")
+                st.markdown(f"**Property Type:** {prop.property_type}")
+                st.markdown(f"**Year Built:** {prop.year_built}")
+                st.markdown(f"**Council Tax:** {prop.council_tax_band} - £{prop.council_tax_charge}")
+                st.markdown(f"**Deeds:** {prop.class_of_title}")
+            except MissingField as e:
+                unavailable("Overview", "Property details unavailable", e)
 
         with col2:
             try:
                 st.subheader("Property Details")
-                st.markdown(f"**Plot Area:** {data['data']['attributes']['plot']['total_plot_area_square_metres']} sqm")
-                st.markdown(f"**Outdoor Space:** {data['data']['attributes']['outdoor_space']['outdoor_space_area_square_metres']} sqm")
-                st.markdown(f"**Number of Bedrooms:** {data['data']['attributes']['number_of_bedrooms']['value']}")
-                st.markdown(f"**Number of Bathrooms:** {data['data']['attributes']['number_of_bathrooms']['value']}")
-            except:
-                st.markdown("Detailed property measurements unavailable.")
-
-        # Transactions Section
+                st.markdown(f"**Plot Area:** {prop.plot_area} sqm")
+                st.markdown(f"**Outdoor Space:** {prop.outdoor_space_area} sqm")
+                st.markdown(f"**Number of Bedrooms:** {prop.bedrooms}")
+                st.markdown(f"**Number of Bathrooms:** {prop.bathrooms}")
+            except MissingField as e:
+                unavailable("Overview", "Detailed property measurements unavailable", e)
+
+
+@st.fragment
+def transactions_section(key, prop):
+    with section("Transactions"):
         st.header("Property Transactions")
         try:
-            if data['data']['attributes'].get('transactions') and data['data']['attributes']['transactions']:
+            if prop.transactions:
+                latest = prop.transactions[0]
                 st.subheader("Latest Transaction")
                 col1, col2 = st.columns(2)
                 with col1:
-                    st.markdown(f"**Date:** {data['data']['attributes']['transactions'][0]['date']}")
-                    st.markdown(f"**Price:** £{data['data']['attributes']['transactions'][0]['price']}")
+                    st.markdown(f"**Date:** {latest.date}")
+                    st.markdown(f"**Price:** £{latest.price}")
                 with col2:
-                    st.markdown(f"**Property Type:** {data['data']['attributes']['transactions'][0]['property_type']}")
-                    st.markdown(f"**Transaction ID:** {data['data']['attributes']['transactions'][0]['transaction_id']}")
+                    st.markdown(f"**Property Type:** {latest.property_type}")
+                    st.markdown(f"**Transaction ID:** {latest.transaction_id}")
             else:
                 st.markdown("No transaction history available.")
-        except:
-            st.markdown("Transaction details unavailable.")
+        except MissingField as e:
+            unavailable("Transactions", "Transaction details unavailable", e)
+
 
+@st.fragment
+def estimated_value_section(key, prop):
+    with section("Estimated Value chart"):
         # Estimated Values Line Chart with Y-axis starting at the minimum value
         st.header("Estimated Market Value Over Time")
+        resolution = st.radio("Resolution", list(RESOLUTIONS), horizontal=True, key="estimated_value_resolution")
         try:
-            # Extract estimated_values from the data
-            estimated_values = data['data']['attributes']['estimated_values']
-            
-            # Convert the list of dictionaries into a pandas DataFrame
-            df_estimated_values = pd.DataFrame(estimated_values)
-            
-            # Create a 'date' column from 'year' and 'month'
-            df_estimated_values['date'] = pd.to_datetime(df_estimated_values[['year', 'month']].assign(day=1))
-            
-            # Sort the DataFrame by date
-            df_estimated_values = df_estimated_values.sort_values('date')
-            
-            # Reset index to use 'date' in Altair
-            df_estimated_values = df_estimated_values.reset_index(drop=True)
-            
-            # Find the minimum and maximum estimated market values
-            min_value = df_estimated_values['estimated_market_value'].min()
-            max_value = df_estimated_values['estimated_market_value'].max()
-            
-            # Optional: Adjust the minimum value slightly lower for better visualization
-            y_axis_min = min_value * 0.98  # Adjust as needed
-            
-            # Plot using Altair with custom y-axis range
-            chart = alt.Chart(df_estimated_values).mark_line().encode(
-                x=alt.X('date:T', title='Date'),
-                y=alt.Y('estimated_market_value:Q',
-                        title='Estimated Market Value (£)',
-                        scale=alt.Scale(domain=[y_axis_min, max_value]))
-            ).properties(
-                title='Estimated Market Value Over Time'
-            ).interactive()  # Enable zooming and panning
-            
-            st.altair_chart(chart, use_container_width=True)
-        except:
-            st.markdown("Estimated market value data unavailable.")
-
-
-        # Energy Performance
+            st.vega_lite_chart(estimated_value_spec(key, prop, resolution), use_container_width=True)
+        except MissingField as e:
+            unavailable("Estimated Value chart", "Estimated market value data unavailable", e)
+
+
+@st.fragment
+def energy_section(key, prop):
+    with section("EPC"):
         st.header("Energy Performance")
         try:
             col1, col2 = st.columns(2)
             with col1:
                 st.subheader("EPC Details")
-                st.markdown(f"**Current Rating:** {data['data']['attributes']['energy_performance']['energy_efficiency']['current_rating']}")
-                st.markdown(f"**Potential Rating:** {data['data']['attributes']['energy_performance']['energy_efficiency']['potential_rating']}")
-                st.markdown(f"**Environmental Impact:** {data['data']['attributes']['energy_performance']['environmental_impact']['current_impact']}")
+                st.markdown(f"**Current Rating:** {prop.epc_current_rating}")
+                st.markdown(f"**Potential Rating:** {prop.epc_potential_rating}")
+                st.markdown(f"**Environmental Impact:** {prop.environmental_impact}")
             with col2:
                 st.subheader("Energy Efficiency")
-                st.markdown(f"**Efficiency Percentage:** {data['data']['attributes']['energy_performance']['energy_efficiency']['current_efficiency']}%")
-                st.markdown(f"**Potential Efficiency:** {data['data']['attributes']['energy_performance']['energy_efficiency']['potential_efficiency']}%")
-        except:
-            st.markdown("Energy performance details unavailable.")
+                st.markdown(f"**Efficiency Percentage:** {prop.epc_current_efficiency}%")
+                st.markdown(f"**Potential Efficiency:** {prop.epc_potential_efficiency}%")
+        except MissingField as e:
+            unavailable("EPC", "Energy performance details unavailable", e)
+
 
-        # Estimated Values
+@st.fragment
+def value_estimates_section(key, prop):
+    with section("Value Estimates"):
         st.header("Property Value Estimates")
         try:
             col1, col2 = st.columns(2)
             with col1:
                 st.subheader("Current Estimate")
-                st.markdown(f"**Estimated Market Value:** £{data['data']['attributes']['estimated_values'][0]['estimated_market_value']}")
-                st.markdown(f"**Estimated Rental Value:** £{data['data']['attributes']['estimated_rental_value']['estimated_monthly_rental_value']} per month")
+                st.markdown(f"**Estimated Market Value:** £{prop.latest_estimated_value.estimated_market_value}")
+                st.markdown(f"**Estimated Rental Value:** £{prop.monthly_rental_value} per month")
             with col2:
                 st.subheader("Annual Yield")
-                st.markdown(f"**Annual Rental Yield:** {data['data']['attributes']['estimated_rental_value']['estimated_annual_rental_yield']}%")
-        except:
-            st.markdown("Property value estimates unavailable.")
+                st.markdown(f"**Annual Rental Yield:** {prop.annual_rental_yield}%")
+        except MissingField as e:
+            unavailable("Value Estimates", "Property value estimates unavailable", e)
+
 
-        # Map Section
+@st.fragment
+def map_section(key, prop):
+    with section("Map"):
         st.header("Property Map")
+        radius = st.select_slider(
+            "Show schools and listings within",
+            options=MAP_RADII,
+            value=None,
+            format_func=lambda metres: "All" if metres is None else f"{metres:,} m",
+        )
         try:
-            import pandas as pd  # Ensure pandas is imported
-            
-            # Extract polygon coordinates
-            polygons = data['data']['attributes']['title_deeds']['titles'][0]['polygons']
-            # Assuming we use the first polygon
-            epsg_4326_polygon = polygons[0]['epsg_4326_polygon']
-            coordinates = epsg_4326_polygon['coordinates'][0]  # Get the first (and usually only) polygon
-
-            # Extract property location (add this to mark the house location)
-            property_location = data['data']['attributes']['location']['coordinates']
-            property_lat = property_location['latitude']
-            property_lon = property_location['longitude']
-
-            # Extract education data
-            education_data = data['data']['attributes']['education']
-
-            # Combine all schools into a single list
-            school_categories = ['nursery', 'primary', 'secondary', 'post_16', 'all_through', 'pupil_referral_units', 'special', 'independent']
-            schools = []
-            for category in school_categories:
-                if category in education_data:
-                    for school in education_data[category]:
-                        school_info = {
-                            'name': school.get('name', 'Unknown'),
-                            'latitude': school['location']['coordinates']['latitude'],
-                            'longitude': school['location']['coordinates']['longitude'],
-                            'types': ', '.join(school.get('school_types', [])),
-                            'distance_in_metres': school.get('distance_in_metres', 0)
-                        }
-                        schools.append(school_info)
-
-            # Create a DataFrame for schools
-            df_schools = pd.DataFrame(schools)
-
-            # Compute combined coordinates for bounding box (property polygon, schools, and property location)
-            all_lats = [coord[1] for coord in coordinates]  # Polygon latitudes
-            all_lons = [coord[0] for coord in coordinates]  # Polygon longitudes
-
-            all_lats += df_schools['latitude'].tolist()  # Add school latitudes
-            all_lons += df_schools['longitude'].tolist()  # Add school longitudes
-
-            all_lats.append(property_lat)  # Add property latitude
-            all_lons.append(property_lon)  # Add property longitude
-
-            # Compute bounds
-            min_lat = min(all_lats)
-            max_lat = max(all_lats)
-            min_lon = min(all_lons)
-            max_lon = max(all_lons)
-
-            # Compute center of all features
-            center_lat = (min_lat + max_lat) / 2
-            center_lon = (min_lon + max_lon) / 2
-
-            # Compute zoom level
-            lat_diff = max_lat - min_lat
-            lon_diff = max_lon - min_lon
-            zoom = 12  # Starting zoom level; adjust as needed
-
-            # Adjust zoom based on the extent of the data
-            max_extent = max(lat_diff, lon_diff)
-            if max_extent < 0.01:
-                zoom = 15
-            elif max_extent < 0.05:
-                zoom = 14
-            elif max_extent < 0.1:
-                zoom = 13
-            else:
-                zoom = 12
-
-            # Create a PyDeck layer for the polygon
-            polygon_layer = pdk.Layer(
-                'PolygonLayer',
-                data=[{
-                    'path': coordinates,  # List of [lon, lat]
-                    'name': 'Property Boundary'
-                }],
-                get_polygon='path',
-                pickable=True,
-                stroked=True,
-                filled=True,
-                extruded=False,
-                wireframe=True,
-                get_fill_color='[255, 0, 0, 100]',
-                get_line_color='[255, 0, 0, 255]',
-            )
-
-            # Create a ScatterplotLayer for schools
-            schools_layer = pdk.Layer(
-                'ScatterplotLayer',
-                data=df_schools,
-                get_position='[longitude, latitude]',
-                get_radius=100,  # Adjust the radius size as needed
-                get_fill_color='[0, 0, 255, 160]',  # Blue color with transparency
-                pickable=True,
-                auto_highlight=True,
-            )
-
-            # Create a ScatterplotLayer for the property location (red dot)
-            house_layer = pdk.Layer(
-                'ScatterplotLayer',
-                data=[{'latitude': property_lat, 'longitude': property_lon}],
-                get_position='[longitude, latitude]',
-                get_radius=150,  # Adjust the radius size as needed
-                get_fill_color='[255, 0, 0, 255]',  # Red color
-                pickable=False,
-            )
-
-            # Update tooltip to include school info
-            tooltip = {
-                "html": "<b>{name}</b><br/>Type: {types}<br/>Distance: {distance_in_metres}m",
-                "style": {
-                    "backgroundColor": "steelblue",
-                    "color": "white"
-                }
-            }
-
-            view_state = pdk.ViewState(
-                longitude=center_lon,
-                latitude=center_lat,
-                zoom=zoom,
-                pitch=0,
-            )
-
-            # Update the Deck to include the new house_layer
-            r = pdk.Deck(
-                layers=[polygon_layer, schools_layer, house_layer],
-                initial_view_state=view_state,
-                tooltip=tooltip
-            )
-
             # Render the map with the schools and house location included
-            st.pydeck_chart(r)
+            deck, deck_bytes = property_deck(key, prop, radius)
+            st.pydeck_chart(deck, height=MAP_HEIGHT)
+            st.caption(f"Map payload: {deck_bytes / 1024:.1f} KiB")
+        except (MissingField, IndexError) as e:
+            unavailable("Map", "Map data unavailable", e)
 
-        except:
-            st.markdown("Map data unavailable.")
 
-        # Market Statistics Section
+@st.fragment
+def market_statistics_section(key, prop, postcode):
+    with section("Market Statistics"):
         st.header("Market Statistics")
-
+        area = outcode(postcode)
+        _, fetched_at = get_outcode_cache().get(area)
+        # Statistics cached with the response before the outcode cache
+        # existed are keyed on the property instead
+        spec_key = area if fetched_at is not None else key
+        resolution = st.radio("Resolution", ["Auto"] + list(RESOLUTIONS), horizontal=True, key="sales_resolution")
         try:
-            # Extract market statistics data
-            market_stats = data['data']['attributes']['market_statistics']['outcode']
-            
+            # Build both charts up front so a missing field is reported once
+            monthly_spec = monthly_sales_spec(spec_key, fetched_at, prop, None if resolution == "Auto" else resolution)
+            bracket_spec = price_bracket_spec(spec_key, fetched_at, prop)
+
             # Create tabs for the two charts
             tab1, tab2 = st.tabs(["Monthly Sales and Average Price", "Sales by Price Bracket"])
-            
             with tab1:
-                # Prepare data for the first chart
-                sales_monthly = market_stats['sales_monthly']
-                df_sales_monthly = pd.DataFrame(sales_monthly)
-                
-                # Create a 'date' column from 'year' and 'month'
-                df_sales_monthly['date'] = pd.to_datetime(df_sales_monthly[['year', 'month']].assign(day=1))
-                
-                # Sort the DataFrame by date
-                df_sales_monthly = df_sales_monthly.sort_values('date')
-                
-                # Create base chart
-                base = alt.Chart(df_sales_monthly).encode(
-                    x=alt.X('date:T', title='Date')
-                )
-                
-                # Line chart for average price
-                line = base.mark_line(color='blue', strokeWidth=3).encode(
-                    y=alt.Y('average_price:Q', axis=alt.Axis(title='Average Price (£)'), scale=alt.Scale(zero=False)),
-                    tooltip=[alt.Tooltip('date:T', title='Date'),
-                            alt.Tooltip('average_price:Q', title='Average Price (£)', format=',')]
-                )
-                
-                # Bar chart for count of sales
-                bar = base.mark_bar(color='orange', opacity=0.6).encode(
-                    y=alt.Y('count_of_sales:Q', axis=alt.Axis(title='Count of Sales')),
-                    tooltip=[alt.Tooltip('date:T', title='Date'),
-                            alt.Tooltip('count_of_sales:Q', title='Count of Sales')]
-                )
-                
-                # Layer the charts and use dual y-axes
-                chart = alt.layer(
-                    bar,
-                    line.encode(y=alt.Y('average_price:Q', axis=alt.Axis(title='Average Price (£)', orient='right'), scale=alt.Scale(zero=False)))
-                ).resolve_scale(
-                    y='independent'  # Use independent scales for y-axes
-                ).properties(
-                    width=700,
-                    height=400,
-                    title='Monthly Sales and Average Price'
-                ).interactive()
-
-                st.altair_chart(chart, use_container_width=True)
-            
+                st.vega_lite_chart(monthly_spec, use_container_width=True)
             with tab2:
-                # Prepare data for the second chart
-                sales_price_bracket = market_stats['sales_price_bracket']
-                df_price_bracket = pd.DataFrame(sales_price_bracket)
-                
-                # Create the chart
-                bar_chart = alt.Chart(df_price_bracket).mark_bar(color='teal').encode(
-                    x=alt.X('price_bracket_name:N', sort='ascending', title='Price Bracket'),
-                    y=alt.Y('count_of_sales:Q', title='Count of Sales'),
-                    tooltip=[
-                        alt.Tooltip('price_bracket_name:N', title='Price Bracket'),
-                        alt.Tooltip('count_of_sales:Q', title='Count of Sales')
-                    ]
-                ).properties(
-                    width=700,
-                    height=400,
-                    title='Sales by Price Bracket'
-                ).configure_axisX(
-                    labelAngle=-45  # Rotate x-axis labels for better readability
-                )
-                
-                st.altair_chart(bar_chart, use_container_width=True)
-                
-        except:
-            st.markdown("Market statistics data unavailable.")
+                st.vega_lite_chart(bracket_spec, use_container_width=True)
+        except MissingField as e:
+            unavailable("Market Statistics", "Market statistics data unavailable", e)
 
+
+@st.fragment
+def comparables_section(key, postcode):
+    with section("Local Comparables"):
+        area = outcode(postcode)
+        st.header(f"Comparable Sales in {area}")
+        store = get_property_store()
+        col1, col2 = st.columns(2)
+        with col1:
+            months = st.select_slider("Sold in the last", options=COMPARABLE_MONTHS, value=12,
+                                      format_func=lambda months: f"{months} months")
+        with col2:
+            property_type = st.selectbox("Property type", ["All"] + store.property_types(area))
+        property_type = None if property_type == "All" else property_type
+
+        started = time.perf_counter()
+        df_sales = store.comparable_sales(area, months, property_type)
+        df_brackets = store.price_bracket_distribution(area, months, property_type=property_type)
+        query_ms = (time.perf_counter() - started) * 1000
+
+        if df_sales.empty:
+            st.write(f"No sales in {area} stored locally for this period yet.")
+        else:
+            tab1, tab2 = st.tabs(["Sales", "Sales by Price Bracket"])
+            with tab1:
+                st.dataframe(df_sales, use_container_width=True, hide_index=True)
+            with tab2:
+                st.bar_chart(df_brackets, x="bracket_floor", y="count_of_sales",
+                             x_label="Price Bracket (£)", y_label="Count of Sales")
+        st.caption(f"{store.stats()['transactions']:,} sales stored locally, queried in {query_ms:.1f} ms")
+
+
+@st.fragment
+def nearby_listings_section(key, prop):
+    with section("Nearby Listings"):
         st.header("Nearby Listings")
         tab1, tab2 = st.tabs(["Completed Listings", "Sale Listings"])
 
         with tab2:
             try:
-                sale_listings = data['data']['attributes']['nearby_completed_transactions']
-                if sale_listings:
-                    num_cols = 3
-                    cols = st.columns(num_cols)
-                    for idx, listing in enumerate(sale_listings[:9]):
-                        col = cols[idx % num_cols]
-                        with col:
-                            address = listing['address']['royal_mail_format'].get('thoroughfare', 'N/A')
-                            listing_type = listing.get('listing_type', 'N/A').capitalize()
-                            listed_date = listing.get('listed_date', 'N/A')
-                            number_of_bedrooms = listing.get('number_of_bedrooms', 'N/A')
-                            status = listing.get('status', 'N/A')
-                            price = listing.get('price', 'N/A')
-
-                            st.markdown(f"**Address:** {address}")
-                            st.markdown(f"**Listing Type:** {listing_type}")
-                            st.markdown(f"**Listed Date:** {listed_date}")
-                            st.markdown(f"**Bedrooms:** {number_of_bedrooms}")
-                            st.markdown(f"**Status:** {status}")
-                            st.markdown(f"**Price:** £{price:,}")
-                            st.markdown("---")
+                df_completed = listings_table(key, prop, "completed")
+                if not df_completed.empty:
+                    listings_browser(f"completed_{key}", df_completed)
                 else:
                     st.write("No nearby sale listings available.")
-            except KeyError:
-                st.markdown("Nearby listings data unavailable.")
-            except Exception as e:
-                st.markdown(f"An error occurred while displaying nearby listings: {str(e)}")
+            except MissingField as e:
+                unavailable("Nearby Listings", "Nearby listings data unavailable", e)
 
         with tab1:
             try:
-                sale_listings = data['data']['attributes']['nearby_listings']['sale_listings']
-                if sale_listings:
-                    num_cols = 3
-                    cols = st.columns(num_cols)
-                    for idx, listing in enumerate(sale_listings[:9]):
-                        col = cols[idx % num_cols]
-                        with col:
-                            address = listing['address']['royal_mail_format'].get('thoroughfare', 'N/A')
-                            listing_type = listing.get('listing_type', 'N/A').capitalize()
-                            listed_date = listing.get('listed_date', 'N/A')
-                            number_of_bedrooms = listing.get('number_of_bedrooms', 'N/A')
-                            status = listing.get('status', 'N/A')
-                            price = listing.get('price', 'N/A')
-                            main_image_url = listing.get('main_image_url', None)
-
-                            if main_image_url:
-                                st.image(main_image_url, use_container_width='always')
-                            else:
-                                st.write("No image available")
-
-                            st.markdown(f"**Address:** {address}")
-                            st.markdown(f"**Listing Type:** {listing_type}")
-                            st.markdown(f"**Listed Date:** {listed_date}")
-                            st.markdown(f"**Bedrooms:** {number_of_bedrooms}")
-                            st.markdown(f"**Status:** {status}")
-                            st.markdown(f"**Price:** £{price:,}")
-                            st.markdown("---")
+                df_sale = listings_table(key, prop, "sale")
+                if not df_sale.empty:
+                    listings_browser(f"sale_{key}", df_sale, show_images=True)
                 else:
                     st.write("No nearby sale listings available.")
-            except KeyError:
-                st.markdown("Nearby listings data unavailable.")
-            except:
-                st.markdown(f"An error occurred while displaying nearby listings: {str(e)}")
+            except MissingField as e:
+                unavailable("Nearby Listings", "Nearby listings data unavailable", e)
+
+
+# The response attributes each section reads, in page order. A section is
+# drawn once they have all arrived; None means it needs the whole response
+# (the comparables come from the store it is saved to).
+SECTION_FIELDS = [
+    {"address", "property_type", "year_built", "council_tax", "title_deeds", "plot", "outdoor_space",
+     "number_of_bedrooms", "number_of_bathrooms"},
+    {"transactions"},
+    {"estimated_values"},
+    {"energy_performance"},
+    {"estimated_values", "estimated_rental_value"},
+    {"location", "title_deeds", "education", "nearby_listings"},
+    {"market_statistics"},
+    None,
+    {"nearby_listings", "nearby_completed_transactions"},
+]
+
+
+def page_sections(key, prop, postcode):
+    """A callable drawing each section, in the order of ``SECTION_FIELDS``."""
+    return [
+        lambda: overview_section(key, prop),
+        lambda: transactions_section(key, prop),
+        lambda: estimated_value_section(key, prop),
+        lambda: energy_section(key, prop),
+        lambda: value_estimates_section(key, prop),
+        lambda: map_section(key, prop),
+        lambda: market_statistics_section(key, prop, postcode),
+        lambda: comparables_section(key, postcode),
+        lambda: nearby_listings_section(key, prop),
+    ]
 
 
-    except:
-        st.markdown(f"An error occurred: {str(e)}")
-        st.markdown("Please ensure results.json exists in the same directory.")
+st.title("🏠 Property Data Dashboard")
+
+# Address and Postcode Input
+col1, col2 = st.columns(2)
+with col1:
+    address = st.text_input("Address")
+with col2:
+    postcode = st.text_input("Postcode")
+
+if st.button("Submit"):
+    key = None
+    # Draw each section as soon as the attributes it needs have arrived,
+    # into a slot reserved for it so the page keeps its order
+    slots = [st.container() for _ in SECTION_FIELDS]
+    pending = list(range(len(SECTION_FIELDS)))
+    arrived = set()
+    prop = None
+    st.session_state.deferred_thumbnails = []
+    try:
+        with request_context() as request_id, timed("dashboard_lookup"):
+            st.session_state.request_id = request_id
+            started = time.perf_counter()
+            for data, attribute, fetched_at in lookup_property_stream(address, postcode):
+                key = key or response_key(address, postcode, fetched_at)
+                if attribute is None:
+                    # The whole response is in (or came from the cache)
+                    prop = load_property(key, data)
+                else:
+                    arrived.add(attribute)
+                    if prop is None:
+                        prop = Property(data)
+                sections = page_sections(key, prop, postcode)
+                for index in list(pending):
+                    fields = SECTION_FIELDS[index]
+                    if attribute is None or (fields is not None and fields <= arrived):
+                        if len(pending) == len(SECTION_FIELDS):
+                            METRICS.observe("dashboard_first_section_seconds", time.perf_counter() - started)
+                        with slots[index]:
+                            sections[index]()
+                        pending.remove(index)
+            log_event("lookup", key=key, seconds=round(time.perf_counter() - started, 4))
+            # Nothing streamed in means the cache served it
+            get_watchlist().record_view(address, postcode, from_cache=not arrived)
+    except StreetDataError as e:
+        st.error(f"Property lookup failed: {e}")
+        st.stop()
+    except ValueError as e:
+        st.error(f"Data source is misconfigured: {e}")
+        st.stop()
+    except MissingField as e:
+        st.error(f"Unexpected response from Street Data ({e}).")
+        st.stop()
+    finally:
+        deferred = st.session_state.pop("deferred_thumbnails", [])
+
+    # Keep the result so later reruns (widgets, fragments) don't refetch it
+    st.session_state.property_key = key
+    st.session_state.property_postcode = postcode
+    st.session_state.property_data = data
+
+    # Only now wait on listing photos, with every section drawn
+    for thumbnails, loading in deferred:
+        fill_thumbnails(thumbnails, loading)
+
+elif "property_key" in st.session_state:
+    key = st.session_state.property_key
+    prop = load_property(key, st.session_state.property_data)
+    for render in page_sections(key, prop, st.session_state.property_postcode):
+        render()
+
+# Response cache counters
+cache_stats = get_response_cache().stats()
+update_cache_gauges(cache_stats)
+st.sidebar.caption(
+    f"Cache: {cache_stats['memory_hits'] + cache_stats['disk_hits']} hits, "
+    f"{cache_stats['misses']} misses, {cache_stats['disk_entries']} stored"
+)
+
+outcode_stats = get_outcode_cache().stats()
+st.sidebar.caption(
+    f"Outcode statistics: {outcode_stats['entries']} outcodes, {outcode_stats['hits']} shared, "
+    f"{outcode_stats['bytes_deduplicated'] / 1024:.0f} KiB kept out of responses"
+)
+
+# Scheduled refresh of outcode statistics, if configured
+outcode_refresh = setting("OUTCODE_REFRESH_SECONDS")
+if outcode_refresh:
+    start_outcode_refresh(float(outcode_refresh))
+
+# Off-peak prefetch of the watchlist, if configured
+if setting("PREFETCH_WINDOW"):
+    start_prefetch(float(setting("PREFETCH_INTERVAL", 300)))
+
+# Prometheus export, if configured
+metrics_port = setting("METRICS_PORT")
+if metrics_port:
+    start_metrics_server(int(metrics_port))
+metrics_file = setting("METRICS_FILE")
+if metrics_file:
+    METRICS.write(metrics_file)
+
+if st.sidebar.checkbox("Debug panel", value=bool(setting("DEBUG_PANEL"))):
+    with st.sidebar:
+        st.subheader("Debug")
+        api_latency = get_client().latency_summary()
+        if api_latency["requests"]:
+            st.caption(
+                f"API: {api_latency['requests']} requests, "
+                f"p50 {api_latency['p50'] * 1000:.0f} ms, p95 {api_latency['p95'] * 1000:.0f} ms"
+            )
+        thumbnail_stats = get_thumbnail_cache().stats()
+        st.caption(
+            f"Thumbnails: {thumbnail_stats['entries']} cached, {thumbnail_stats['failures']} failed, "
+            f"{thumbnail_stats['bytes_downloaded'] / 2**20:.1f} MiB downloaded, "
+            f"{thumbnail_stats['bytes_stored'] / 1024:.0f} KiB of thumbnails written"
+        )
+        # Render timings from the last full run; fragment reruns update their own entry
+        for name, seconds in st.session_state.get("render_times", {}).items():
+            st.caption(f"{name}: {seconds * 1000:.1f} ms")
+        st.caption(f"Full run: {(time.perf_counter() - run_started) * 1000:.1f} ms")
+        st.dataframe(
+            [dict(row, labels=", ".join(f"{k}={v}" for k, v in row["labels"].items())) for row in METRICS.snapshot()],
+            use_container_width=True,
+        )
+        st.download_button("Download metrics", METRICS.to_prometheus(), file_name="metrics.prom", mime="text/plain")
@@ -0,0 +1,207 @@
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentation import METRICS, current_request_id, log_event
+from json_stream import iter_members
+
+API_URL = "https://api.data.street.co.uk/street-data-api/v2/properties/addresses"
+
+# Read size for streamed response bodies
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Responses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class StreetDataError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_retry_after(value):
+    """Return the delay in seconds requested by a Retry-After header, if any."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class StreetDataClient:
+    """Keep-alive HTTP client for the Street Data properties/addresses API.
+
+    One instance is meant to be shared per process: the underlying session
+    pools connections so repeat lookups skip the TCP and TLS handshakes.
+    Every request is bounded by ``timeout`` (connect, read). Failed
+    connections and 429/5xx responses are retried with full-jitter
+    exponential backoff, waiting at least as long as the server's
+    Retry-After asks; a read timeout is not, since the lookup may already
+    have been billed.
+    """
+
+    # Live responses may be stored in the response cache
+    cacheable = True
+
+    def __init__(
+        self,
+        api_key,
+        url=API_URL,
+        timeout=(3.05, 30),
+        max_retries=3,
+        backoff=0.5,
+        max_backoff=30,
+        pool_maxsize=10,
+    ):
+        self.api_key = api_key
+        self.url = url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'X-Api-Key': api_key
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # (status, seconds, attempts) for the most recent lookups
+        self.latencies = deque(maxlen=500)
+
+    def lookup(self, address, postcode, tier="premium"):
+        """POST an address lookup and return the decoded JSON body."""
+        response = self._request(address, postcode, tier)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise StreetDataError(f"Street Data API returned invalid JSON: {e}", status=response.status_code)
+
+    def lookup_events(self, address, postcode, tier="premium"):
+        """POST an address lookup and yield (path, value) for each attribute as it arrives.
+
+        The body is parsed while it downloads (see json_stream), so the
+        first attributes can be shown before the last have arrived.
+        """
+        response = self._request(address, postcode, tier, stream=True)
+        received = 0
+        # Time spent waiting on the body itself, not parsing it or drawing
+        # what has arrived
+        downloading = 0.0
+
+        def chunks():
+            nonlocal received, downloading
+            body = response.iter_content(STREAM_CHUNK_BYTES)
+            while True:
+                started = time.perf_counter()
+                chunk = next(body, None)
+                downloading += time.perf_counter() - started
+                if chunk is None:
+                    return
+                received += len(chunk)
+                yield chunk
+
+        try:
+            yield from iter_members(chunks(), ("data", "attributes"))
+        except requests.RequestException as e:
+            raise StreetDataError(f"Street Data API response was cut off: {e}", status=response.status_code) from e
+        except ValueError as e:
+            raise StreetDataError(f"Street Data API returned invalid JSON: {e}", status=response.status_code)
+        finally:
+            response.close()
+            METRICS.inc("street_data_response_bytes_total", received)
+            METRICS.observe("street_data_body_seconds", downloading)
+
+    def _request(self, address, postcode, tier, stream=False):
+        if not self.api_key:
+            raise StreetDataError("No Street Data API key configured (DATA_STREET_KEY).")
+        payload = {
+            "data": {
+                "address": address,
+                "postcode": postcode
+            }
+        }
+        request_id = current_request_id()
+        started = time.perf_counter()
+        try:
+            response, attempts = self._post(payload, {"tier": tier}, {"X-Request-Id": request_id}, stream)
+        except StreetDataError as e:
+            METRICS.inc("street_data_request_failures_total", exception=type(e.__cause__ or e).__name__)
+            log_event("street_data_request", request_id=request_id, tier=tier, error=str(e))
+            raise
+        # Streamed bodies haven't arrived yet, so this is time to first byte
+        seconds = time.perf_counter() - started
+        self.latencies.append((response.status_code, seconds, attempts))
+        METRICS.observe("street_data_request_seconds", seconds, status=response.status_code)
+        if not stream or not response.ok:
+            METRICS.inc("street_data_response_bytes_total", len(response.content))
+        log_event(
+            "street_data_request", request_id=request_id, tier=tier, status=response.status_code,
+            seconds=round(seconds, 4), attempts=attempts, stream=stream,
+            response_bytes=None if stream and response.ok else len(response.content),
+        )
+
+        if not response.ok:
+            raise StreetDataError(
+                f"Street Data API returned {response.status_code}: {response.text[:200]}",
+                status=response.status_code,
+            )
+        return response
+
+    def _post(self, payload, params, headers, stream=False):
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = self.session.post(
+                    self.url, params=params, json=payload, headers=headers, timeout=self.timeout, stream=stream,
+                )
+            except requests.ConnectionError as e:
+                # Includes ConnectTimeout. Only these are safe to resend:
+                # a read timeout may follow a request the API has already
+                # received and billed for.
+                if attempt > self.max_retries:
+                    raise StreetDataError(f"Street Data API unreachable after {attempt} attempts: {e}") from e
+                time.sleep(self._backoff_delay(attempt))
+                continue
+            except requests.Timeout as e:
+                raise StreetDataError(f"Street Data API timed out: {e}") from e
+
+            if response.status_code not in RETRY_STATUSES or attempt > self.max_retries:
+                return response, attempt
+
+            delay = self._backoff_delay(attempt)
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                if retry_after > self.max_backoff:
+                    # Not worth holding a Streamlit worker this long
+                    return response, attempt
+                delay = max(delay, retry_after)
+            response.close()
+            time.sleep(delay)
+
+    def _backoff_delay(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    def latency_summary(self):
+        seconds = sorted(latency for _, latency, _ in self.latencies)
+        if not seconds:
+            return {"requests": 0}
+        return {
+            "requests": len(seconds),
+            "p50": seconds[len(seconds) // 2],
+            "p95": seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))],
+            "max": seconds[-1],
+        }
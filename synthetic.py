@@ -0,0 +1,151 @@
+"""Synthetic Street Data responses for offline replay, load tests and benchmarks.
+
+    python synthetic.py fixtures/replay.jsonl --count 20
+
+writes a replay corpus (see data_source.py) with a mix of the profiles
+below. Responses have the shape the dashboard parses, not real data.
+"""
+import argparse
+import json
+import math
+import random
+
+from models import SCHOOL_CATEGORIES
+
+# Response sizes: months of estimated values, schools, listings per
+# collection, title polygons, vertices per polygon, months of outcode sales
+PROFILES = {
+    "small": dict(values=12, schools=8, listings=3, polygons=1, vertices=8, sales_months=12),
+    "typical": dict(values=120, schools=40, listings=12, polygons=1, vertices=40, sales_months=60),
+    "large": dict(values=600, schools=800, listings=200, polygons=6, vertices=2000, sales_months=240),
+}
+
+STREETS = ["High Street", "Church Road", "Station Road", "Victoria Road", "Green Lane", "Manor Road"]
+OUTCODES = ["SW1A", "M1", "B15", "LS6", "BS8", "EH3", "CF10", "NE1"]
+
+
+def _point(rng, lat, lon, spread=0.02):
+    return {"latitude": round(lat + rng.uniform(-spread, spread), 6),
+            "longitude": round(lon + rng.uniform(-spread, spread), 6)}
+
+
+def _ring(rng, lat, lon, vertices, size=0.0005):
+    ring = []
+    for i in range(vertices):
+        angle = 2 * math.pi * i / vertices
+        radius = size * (1 + 0.2 * rng.random())
+        ring.append([round(lon + radius * 1.6 * math.cos(angle), 9), round(lat + radius * math.sin(angle), 9)])
+    ring.append(ring[0])
+    return ring
+
+
+def _listing(rng, lat, lon, index, listing_type):
+    return {
+        "address": {"royal_mail_format": {"thoroughfare": rng.choice(STREETS), "building_number": str(index + 1)}},
+        "listing_type": listing_type,
+        "listed_date": f"{rng.randint(2021, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "number_of_bedrooms": rng.randint(1, 6),
+        "status": rng.choice(["available", "under_offer", "sold_stc", "completed"]),
+        "price": rng.randrange(150_000, 1_500_000, 5_000),
+        "main_image_url": None,
+        "location": {"coordinates": _point(rng, lat, lon, 0.01)},
+        "distance_in_metres": rng.randint(50, 1500),
+    }
+
+
+def synthetic_response(profile="typical", seed=0, address="1 High Street", postcode="SW1A 1AA"):
+    """One premium-tier properties/addresses response of the given profile."""
+    size = PROFILES[profile]
+    rng = random.Random(f"{profile}-{seed}")
+    lat, lon = 51.5 + rng.uniform(-1, 2), -1.5 + rng.uniform(-1.5, 1.5)
+
+    value = rng.randrange(150_000, 900_000, 1_000)
+    estimated_values = []
+    for i in range(size["values"]):
+        value = max(50_000, int(value * (1 + rng.gauss(0.003, 0.01))))
+        estimated_values.append({"year": 2024 - (size["values"] - i) // 12, "month": 12 - (size["values"] - i) % 12,
+                                 "estimated_market_value": value})
+    # The API lists the newest estimate first
+    estimated_values.reverse()
+
+    education = {category: [] for category in SCHOOL_CATEGORIES}
+    for i in range(size["schools"]):
+        category = SCHOOL_CATEGORIES[i % len(SCHOOL_CATEGORIES)]
+        education[category].append({
+            "name": f"{rng.choice(STREETS).split()[0]} {category.replace('_', ' ').title()} School {i}",
+            "location": {"coordinates": _point(rng, lat, lon)},
+            "school_types": [rng.choice(["Academy", "Community", "Voluntary aided", "Free school"])],
+            "distance_in_metres": rng.randint(100, 5000),
+        })
+
+    sales_monthly = [{
+        "year": 2024 - (size["sales_months"] - i) // 12,
+        "month": 12 - (size["sales_months"] - i) % 12,
+        "average_price": rng.randrange(200_000, 600_000, 500),
+        "count_of_sales": rng.randint(3, 80),
+    } for i in range(size["sales_months"])]
+
+    return {"data": {"type": "property", "id": f"synthetic-{profile}-{seed}", "attributes": {
+        "address": {"street_group_format": {"address_lines": address, "postcode": postcode}},
+        "property_type": {"value": rng.choice(["Detached", "Semi-detached", "Terraced", "Flat"])},
+        "year_built": {"value": rng.randint(1850, 2020)},
+        "council_tax": {"band": rng.choice("ABCDEFGH"), "current_annual_charge": rng.randint(1000, 4000)},
+        "title_deeds": {"titles": [{
+            "title_number": f"SYN{seed}{t}",
+            "class_of_title": rng.choice(["Freehold", "Leasehold"]),
+            "polygons": [{"epsg_4326_polygon": {"type": "Polygon", "coordinates": [
+                _ring(rng, lat + t * 0.001, lon, size["vertices"])
+            ]}}],
+        } for t in range(size["polygons"])]},
+        "plot": {"total_plot_area_square_metres": rng.randint(40, 5000)},
+        "outdoor_space": {"outdoor_space_area_square_metres": rng.randint(0, 2000)},
+        "number_of_bedrooms": {"value": rng.randint(1, 6)},
+        "number_of_bathrooms": {"value": rng.randint(1, 4)},
+        "transactions": [{
+            "date": f"{2024 - 4 * i}-{rng.randint(1, 12):02d}-01",
+            "price": rng.randrange(100_000, 800_000, 1_000),
+            "property_type": "D",
+            "transaction_id": f"{{SYN-{seed}-{i}}}",
+        } for i in range(3)],
+        "estimated_values": estimated_values,
+        "energy_performance": {
+            "energy_efficiency": {"current_rating": rng.choice("BCDEF"), "potential_rating": rng.choice("ABC"),
+                                  "current_efficiency": rng.randint(30, 80), "potential_efficiency": rng.randint(70, 95)},
+            "environmental_impact": {"current_impact": rng.randint(30, 80)},
+        },
+        "estimated_rental_value": {"estimated_monthly_rental_value": rng.randrange(700, 4000, 25),
+                                   "estimated_annual_rental_yield": round(rng.uniform(2.5, 7.5), 2)},
+        "location": {"coordinates": {"latitude": lat, "longitude": lon}},
+        "education": education,
+        "market_statistics": {"outcode": {
+            "sales_monthly": sales_monthly,
+            "sales_price_bracket": [{"price_bracket_name": f"£{low}k-£{low + 100}k", "count_of_sales": rng.randint(0, 120)}
+                                    for low in range(0, 1000, 100)],
+        }},
+        "nearby_listings": {"sale_listings": [_listing(rng, lat, lon, i, "sale") for i in range(size["listings"])]},
+        "nearby_completed_transactions": [_listing(rng, lat, lon, i, "sale") for i in range(size["listings"])],
+    }}}
+
+
+def replay_records(count, profiles=("small", "typical")):
+    """Replay corpus records, cycling through ``profiles``."""
+    records = []
+    for i in range(count):
+        profile = profiles[i % len(profiles)]
+        address = f"{i + 1} {STREETS[i % len(STREETS)]}"
+        postcode = f"{OUTCODES[i % len(OUTCODES)]} {i % 9 + 1}AA"
+        records.append({"address": address, "postcode": postcode, "tier": "premium",
+                        "response": synthetic_response(profile, i, address, postcode)})
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="JSONL file to write")
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--profiles", default="small,typical", help=f"comma separated, from {', '.join(PROFILES)}")
+    args = parser.parse_args()
+
+    with open(args.path, "w", encoding="utf-8") as file:
+        for record in replay_records(args.count, args.profiles.split(",")):
+            file.write(json.dumps(record, separators=(",", ":")) + "\n")
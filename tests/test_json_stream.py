@@ -0,0 +1,104 @@
+import json
+import random
+import unittest
+
+from json_stream import insert, iter_members
+
+PATH = ("data", "attributes")
+
+DOCUMENT = {
+    "data": {
+        "type": "property",
+        "id": "abc-123",
+        "attributes": {
+            "address": {"street_group_format": {"address_lines": "Flat 1, 2 Église Road", "postcode": "M1 2AA"}},
+            "year_built": {"value": 1971},
+            "plot": {"total_plot_area_square_metres": 4527.5},
+            "outdoor_space": None,
+            "listed": False,
+            "tags": ["a", "b\"c", "d\\e", {"nested": [1, 2.5e3, -3]}],
+            'key with "quotes"': "£250,000 \U0001f3e0",
+            "estimated_values": [{"year": 2000 + i, "month": 1, "estimated_market_value": 100000 + i} for i in range(200)],
+        },
+    },
+    "meta": {"tier": "premium"},
+}
+
+
+def rebuild(chunks, path=PATH):
+    body = {}
+    for member_path, value in iter_members(chunks, path):
+        insert(body, member_path, value)
+    return body
+
+
+def split(raw, sizes):
+    chunks, start = [], 0
+    for size in sizes:
+        chunks.append(raw[start:start + size])
+        start += size
+    chunks.append(raw[start:])
+    return chunks
+
+
+class IterMembersTest(unittest.TestCase):
+    def test_whole_document(self):
+        raw = json.dumps(DOCUMENT).encode("utf-8")
+        self.assertEqual(rebuild([raw]), DOCUMENT)
+
+    def test_every_two_way_split(self):
+        # Splits land inside keys, strings, numbers, escapes and multi-byte characters
+        raw = json.dumps(DOCUMENT["data"]["attributes"]["address"], ensure_ascii=False).encode("utf-8")
+        raw = b'{"data": {"attributes": {"address": ' + raw + b', "year": 1971}}}'
+        expected = json.loads(raw)
+        for cut in range(len(raw) + 1):
+            self.assertEqual(rebuild([raw[:cut], raw[cut:]]), expected, cut)
+
+    def test_random_chunking(self):
+        rng = random.Random(0)
+        for indent in (None, 2):
+            raw = json.dumps(DOCUMENT, indent=indent, ensure_ascii=False).encode("utf-8")
+            for _ in range(200):
+                sizes = [rng.randint(1, 64) for _ in range(rng.randint(1, 40))]
+                self.assertEqual(rebuild(split(raw, sizes)), DOCUMENT)
+
+    def test_one_byte_chunks(self):
+        raw = json.dumps(DOCUMENT, ensure_ascii=False).encode("utf-8")
+        self.assertEqual(rebuild(raw[i:i + 1] for i in range(len(raw))), DOCUMENT)
+
+    def test_members_yielded_as_they_complete(self):
+        raw = b'{"data": {"attributes": {"first": {"a": 1}, "second": [1, 2]}}}'
+        events = iter_members([raw[:40], raw[40:]], PATH)
+        # The first attribute is out before the second chunk is read
+        self.assertEqual(next(events), (("data",), {}))
+        self.assertEqual(next(events), (("data", "attributes"), {}))
+        self.assertEqual(next(events), (("data", "attributes", "first"), {"a": 1}))
+        self.assertEqual(list(events), [(("data", "attributes", "second"), [1, 2])])
+
+    def test_empty_objects_along_path(self):
+        for document in ({}, {"data": {}}, {"data": {"attributes": {}}}, {"data": {"attributes": {}}, "meta": {}}):
+            raw = json.dumps(document).encode("utf-8")
+            self.assertEqual(rebuild([raw]), document)
+
+    def test_path_member_that_is_not_an_object(self):
+        document = {"data": {"attributes": None}, "errors": ["not found"]}
+        self.assertEqual(rebuild([json.dumps(document).encode("utf-8")]), document)
+
+    def test_truncated_documents(self):
+        raw = json.dumps(DOCUMENT).encode("utf-8")
+        for cut in range(0, len(raw), 97):
+            with self.assertRaises(ValueError, msg=cut):
+                rebuild([raw[:cut]])
+
+    def test_trailing_number_is_not_cut_short(self):
+        with self.assertRaises(ValueError):
+            rebuild([b'{"data": {"attributes": {"year": 19'])
+
+    def test_malformed_documents(self):
+        for raw in (b"[]", b'{"data" 1}', b'{"data": {"attributes": {"a": 1 "b": 2}}}', b'{"a": tru}', b"{,}"):
+            with self.assertRaises(ValueError, msg=raw):
+                rebuild([raw])
+
+
+if __name__ == "__main__":
+    unittest.main()
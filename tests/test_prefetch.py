@@ -0,0 +1,63 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from prefetch import PrefetchScheduler, Watchlist
+from street_client import StreetDataError
+
+
+class PrefetchSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.watchlist = Watchlist(os.path.join(directory.name, "watchlist.sqlite"))
+        self.calls = []
+
+    def scheduler(self, fetch, daily_budget=10):
+        def record(address, postcode, tier):
+            self.calls.append(address)
+            fetch(address)
+
+        return PrefetchScheduler(self.watchlist, record, lambda *args: False, rate_per_second=1000,
+                                 daily_budget=daily_budget)
+
+    def test_any_failure_is_counted_and_the_run_goes_on(self):
+        errors = {"1 A Street": TypeError("bad row"), "2 B Street": sqlite3.OperationalError("locked")}
+        for address in ("1 A Street", "2 B Street", "3 C Street"):
+            self.watchlist.add(address, "AB1 2CD")
+
+        def fetch(address):
+            if address in errors:
+                raise errors[address]
+
+        scheduler = self.scheduler(fetch)
+        summary = scheduler.run_once(force=True)
+        self.assertEqual((summary["fetched"], summary["failed"]), (1, 2))
+        self.assertEqual(self.calls, ["1 A Street", "2 B Street", "3 C Street"])
+        self.assertEqual(scheduler.budget_left(), 7)
+
+    def test_failing_address_backs_off_within_the_budget(self):
+        self.watchlist.add("1 A Street", "AB1 2CD")
+
+        def fetch(address):
+            raise StreetDataError("down", status=503)
+
+        scheduler = self.scheduler(fetch, daily_budget=3)
+        for _ in range(10):
+            scheduler.run_once(force=True)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(scheduler.budget_left(), 2)
+
+    def test_daily_budget_counts_every_attempt(self):
+        for address in ("1 A Street", "2 B Street", "3 C Street"):
+            self.watchlist.add(address, "AB1 2CD")
+        scheduler = self.scheduler(lambda address: None, daily_budget=4)
+        scheduler.run_once(force=True)
+        scheduler.run_once(force=True)
+        self.assertEqual(len(self.calls), 4)
+        self.assertEqual(scheduler.budget_left(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import copy
+import os
+import tempfile
+import unittest
+
+from property_store import PropertyStore
+from synthetic import synthetic_response
+
+
+class PropertyStoreTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = PropertyStore(os.path.join(directory.name, "properties.sqlite"))
+        self.body = synthetic_response("typical", 1, "1 High Street", "M1 2AA")
+        self.attributes = self.body["data"]["attributes"]
+
+    def test_rows_with_missing_values_are_skipped(self):
+        body = copy.deepcopy(self.body)
+        attributes = body["data"]["attributes"]
+        attributes["estimated_values"][0]["estimated_market_value"] = None
+        attributes["estimated_values"][1]["year"] = None
+        attributes["market_statistics"]["outcode"]["sales_monthly"][0]["month"] = None
+        self.store.ingest("1 High Street", "M1 2AA", body)
+        stats = self.store.stats()
+        self.assertEqual(stats["estimated_values"], len(attributes["estimated_values"]) - 2)
+        self.assertEqual(
+            stats["outcode_sales_monthly"], len(attributes["market_statistics"]["outcode"]["sales_monthly"]) - 1
+        )
+
+    def test_ingesting_twice_is_harmless(self):
+        self.store.ingest("1 High Street", "M1 2AA", self.body)
+        first = self.store.stats()
+        self.store.ingest("1 High Street", "M1 2AA", self.body)
+        self.assertEqual(self.store.stats(), first)
+
+    def test_another_spelling_of_the_address_adds_no_sales(self):
+        self.store.ingest("1 High Street", "M1 2AA", self.body)
+        transactions = self.store.stats()["transactions"]
+        self.store.ingest("1 high street,", "m12aa", self.body)
+        self.assertEqual(self.store.stats()["transactions"], transactions)
+        self.assertEqual(self.store.stats()["properties"], 1)
+
+    def test_nearby_sales_without_an_address_are_not_duplicated(self):
+        for sale in self.attributes["nearby_completed_transactions"]:
+            sale["address"] = None
+        self.store.ingest("1 High Street", "M1 2AA", self.body)
+        transactions = self.store.stats()["transactions"]
+        self.store.ingest("1 High Street", "M1 2AA", self.body)
+        self.assertEqual(self.store.stats()["transactions"], transactions)
+        self.assertGreaterEqual(transactions, len(self.attributes["nearby_completed_transactions"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import json
+import socket
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from instrumentation import METRICS
+from json_stream import insert
+from street_client import StreetDataClient, StreetDataError
+
+BODY = {"data": {"attributes": {"address": {"street_group_format": {"address_lines": "1 Test Road"}}}}}
+
+
+def count(snapshot, metric):
+    return sum(row["count"] for row in snapshot if row["metric"] == metric)
+
+
+class StubServer:
+    """A local HTTP server answering each POST with the next scripted reply.
+
+    A reply is ``(status, headers, body)``, or ``("sleep", seconds)`` to
+    stall past the client's read timeout.
+    """
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                stub.requests += 1
+                reply = stub.replies.pop(0)
+                if reply[0] == "sleep":
+                    time.sleep(reply[1])
+                    return
+                status, headers, body = reply
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StreetDataClientTest(unittest.TestCase):
+    def client(self, url, **kwargs):
+        kwargs.setdefault("backoff", 0.01)
+        return StreetDataClient("key", url=url, **kwargs)
+
+    def stub(self, *replies):
+        server = StubServer(replies)
+        self.addCleanup(server.close)
+        return server
+
+    def test_retries_transient_statuses(self):
+        server = self.stub((503, {}, {}), (502, {}, {}), (200, {}, BODY))
+        self.assertEqual(self.client(server.url).lookup("1 Test Road", "AB1 2CD"), BODY)
+        self.assertEqual(server.requests, 3)
+
+    def test_gives_up_after_max_retries(self):
+        server = self.stub(*[(503, {}, {})] * 3)
+        with self.assertRaises(StreetDataError) as caught:
+            self.client(server.url, max_retries=2).lookup("1 Test Road", "AB1 2CD")
+        self.assertEqual(caught.exception.status, 503)
+        self.assertEqual(server.requests, 3)
+
+    def test_client_errors_are_not_retried(self):
+        server = self.stub((404, {}, {"errors": []}))
+        with self.assertRaises(StreetDataError) as caught:
+            self.client(server.url).lookup("1 Test Road", "AB1 2CD")
+        self.assertEqual(caught.exception.status, 404)
+        self.assertEqual(server.requests, 1)
+
+    def test_waits_for_retry_after(self):
+        server = self.stub((429, {"Retry-After": "0.3"}, {}), (200, {}, BODY))
+        started = time.perf_counter()
+        self.assertEqual(self.client(server.url).lookup("1 Test Road", "AB1 2CD"), BODY)
+        self.assertGreaterEqual(time.perf_counter() - started, 0.3)
+        self.assertEqual(server.requests, 2)
+
+    def test_long_retry_after_is_not_waited_for(self):
+        server = self.stub((429, {"Retry-After": "120"}, {}))
+        started = time.perf_counter()
+        with self.assertRaises(StreetDataError) as caught:
+            self.client(server.url, max_backoff=1).lookup("1 Test Road", "AB1 2CD")
+        self.assertEqual(caught.exception.status, 429)
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual(server.requests, 1)
+
+    def test_read_timeout_is_not_retried(self):
+        server = self.stub(("sleep", 1), (200, {}, BODY))
+        with self.assertRaises(StreetDataError):
+            self.client(server.url, timeout=(1, 0.2)).lookup("1 Test Road", "AB1 2CD")
+        # The API may have received (and billed) the first request
+        self.assertEqual(server.requests, 1)
+
+    def test_connection_failures_are_retried(self):
+        # Nothing listens on a port that was just released
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        client = self.client(f"http://127.0.0.1:{port}/", max_retries=2)
+        with self.assertRaises(StreetDataError) as caught:
+            client.lookup("1 Test Road", "AB1 2CD")
+        self.assertIn("after 3 attempts", str(caught.exception))
+
+    def test_lookup_events_streams_attributes(self):
+        server = self.stub((200, {}, BODY))
+        body = {}
+        for path, value in self.client(server.url).lookup_events("1 Test Road", "AB1 2CD"):
+            insert(body, path, value)
+        self.assertEqual(body, BODY)
+
+    def test_body_download_is_timed_separately(self):
+        server = self.stub((200, {}, BODY))
+        before = METRICS.snapshot()
+        events = self.client(server.url).lookup_events("1 Test Road", "AB1 2CD")
+        for _ in events:
+            # Time spent here, between chunks, isn't download time
+            time.sleep(0.2)
+        body_seconds = [row for row in METRICS.snapshot() if row["metric"] == "street_data_body_seconds"]
+        self.assertEqual(body_seconds[0]["count"] - count(before, "street_data_body_seconds"), 1)
+        self.assertLess(body_seconds[0]["last"], 0.2)
+
+    def test_missing_api_key(self):
+        with self.assertRaises(StreetDataError):
+            StreetDataClient("", url="http://127.0.0.1:9/").lookup("1 Test Road", "AB1 2CD")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from PIL import Image
+
+# Listing cards are a third of the page wide; twice that covers HiDPI screens
+THUMBNAIL_SIZE = (480, 360)
+# Don't download more than this for a single listing photo
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+# How long a failed URL is left alone before it is tried again
+RETRY_FAILED_AFTER = 10 * 60
+
+
+def url_key(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def make_thumbnail(content, size=THUMBNAIL_SIZE, quality=80):
+    """Downsize an image to fit ``size`` and return it as JPEG bytes."""
+    image = Image.open(io.BytesIO(content))
+    # Let the JPEG decoder skip detail the thumbnail won't need
+    image.draft("RGB", size)
+    image.thumbnail(size)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=quality, optimize=True)
+    return output.getvalue()
+
+
+class ThumbnailCache:
+    """On-disk LRU cache of listing photo thumbnails, keyed on a hash of the URL.
+
+    ``request`` starts fetching any URLs not on disk yet in a thread pool,
+    each bounded by ``timeout``, so the page can paint placeholders and fill
+    in thumbnails as they arrive. The directory is trimmed to ``max_bytes``
+    by dropping the least recently read files.
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, size=THUMBNAIL_SIZE, timeout=(3.05, 5), max_workers=8):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = size
+        self.timeout = timeout
+        os.makedirs(directory, exist_ok=True)
+        self.session = requests.Session()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail")
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._failed = {}
+        self.counters = {"hits": 0, "misses": 0, "failures": 0, "bytes_downloaded": 0, "bytes_stored": 0}
+
+    def path(self, url):
+        return os.path.join(self.directory, url_key(url) + ".jpg")
+
+    def get(self, url):
+        """Return the cached thumbnail for ``url``, or None."""
+        path = self.path(url)
+        try:
+            with open(path, "rb") as file:
+                content = file.read()
+            # The access time is the LRU clock
+            os.utime(path)
+        except FileNotFoundError:
+            # Missing, or evicted since it was read
+            return None
+        with self._lock:
+            self.counters["hits"] += 1
+        return content
+
+    def request(self, urls):
+        """Return {url: future of thumbnail bytes or None} for every URL not cached yet."""
+        futures = {}
+        now = time.time()
+        with self._lock:
+            for url in dict.fromkeys(urls):
+                if not url or os.path.exists(self.path(url)):
+                    continue
+                if now - self._failed.get(url, 0) < RETRY_FAILED_AFTER:
+                    continue
+                future = self._pending.get(url)
+                if future is None:
+                    self.counters["misses"] += 1
+                    future = self._pending[url] = self._executor.submit(self._fetch, url)
+                futures[url] = future
+        return futures
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            files = [entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith(".jpg")]
+        stats["entries"] = len(files)
+        stats["disk_bytes"] = sum(files)
+        return stats
+
+    def _fetch(self, url):
+        path = self.path(url)
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with self.session.get(url, timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                content = response.raw.read(MAX_IMAGE_BYTES + 1, decode_content=True)
+            if len(content) > MAX_IMAGE_BYTES:
+                raise ValueError(f"image larger than {MAX_IMAGE_BYTES} bytes")
+            thumbnail = make_thumbnail(content, self.size)
+            with open(temporary, "wb") as file:
+                file.write(thumbnail)
+            os.replace(temporary, path)
+        except Exception:
+            # Whatever went wrong (a bad download, a decompression bomb, a
+            # full disk), the card shows no image rather than an error
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            with self._lock:
+                self._failed[url] = time.time()
+                self.counters["failures"] += 1
+            return None
+        finally:
+            with self._lock:
+                self._pending.pop(url, None)
+
+        with self._lock:
+            self.counters["bytes_downloaded"] += len(content)
+            self.counters["bytes_stored"] += len(thumbnail)
+        self._evict()
+        return thumbnail
+
+    def _evict(self):
+        with self._lock:
+            files = [(entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                     for entry in os.scandir(self.directory) if entry.name.endswith(".jpg")]
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+from charts import CHART_WIDTH
+
+# Chart resolutions, finest first, and the pandas period each aggregates to
+RESOLUTIONS = {"Monthly": "MS", "Quarterly": "QS", "Yearly": "YS"}
+
+# Lines are thinned to about one point per horizontal pixel, which also
+# keeps every chart far below Altair's 5,000 row limit
+MAX_POINTS = CHART_WIDTH
+# Bars narrower than 4 pixels are grouped into longer periods instead
+MAX_BARS = CHART_WIDTH // 4
+
+
+def lttb(x, y, threshold):
+    """Indices of ``threshold`` points that keep the shape of the (x, y) line.
+
+    Largest-Triangle-Three-Buckets (Steinarsson, 2013): the first and last
+    points are kept, the rest are split into ``threshold - 2`` buckets, and
+    from each bucket the point forming the largest triangle with the point
+    kept before it and the mean of the next bucket is kept. ``x`` must be
+    sorted.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+        # Twice the triangle areas; the factor doesn't change the argmax
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def downsample(df, column, max_points, x='date'):
+    """At most ``max_points`` rows of a date-sorted frame, chosen by LTTB on ``column``."""
+    if len(df) <= max_points:
+        return df
+    x_values = df[x].to_numpy(dtype='datetime64[ns]').astype('int64')
+    return df.iloc[lttb(x_values, df[column].to_numpy(), max_points)].reset_index(drop=True)
+
+
+def resample(df, resolution, sums=(), means=(), weight=None):
+    """Aggregate a date-sorted monthly frame to ``resolution`` (a RESOLUTIONS key).
+
+    ``sums`` are added up per period and ``means`` averaged, weighted by
+    the ``weight`` column if given (e.g. average prices by count of sales).
+    Periods with no rows are dropped.
+    """
+    rule = RESOLUTIONS[resolution]
+    if rule == "MS":
+        return df
+    indexed = df.set_index('date')
+    grouped = indexed.resample(rule)
+    result = pd.DataFrame(index=grouped.size().index)
+    for column in sums:
+        result[column] = grouped[column].sum()
+    for column in means:
+        if weight is None:
+            result[column] = grouped[column].mean()
+        else:
+            result[column] = (indexed[column] * indexed[weight]).resample(rule).sum() / grouped[weight].sum()
+    return result[grouped.size() > 0].reset_index()
+
+
+def fit_resolution(df, max_points):
+    """The finest resolution with no more than ``max_points`` periods."""
+    if df.empty:
+        return "Monthly"
+    first, last = df['date'].iloc[0], df['date'].iloc[-1]
+    months = (last.year - first.year) * 12 + last.month - first.month + 1
+    for resolution, periods in (("Monthly", months), ("Quarterly", months / 3), ("Yearly", months / 12)):
+        if periods <= max_points:
+            return resolution
+    return "Yearly"
+
+
+def value_series(df, resolution="Monthly"):
+    """Estimated values at ``resolution``, thinned to fit the chart."""
+    df = resample(df, resolution, means=['estimated_market_value'])
+    return downsample(df, 'estimated_market_value', MAX_POINTS)
+
+
+def sales_series(df, resolution=None):
+    """(resolution, monthly sales aggregated to it) for the sales chart.
+
+    ``None`` picks the finest resolution whose bars are wide enough to
+    read; a resolution with more periods than the chart has pixels is
+    coarsened until it fits.
+    """
+    order = list(RESOLUTIONS)
+    if resolution is None:
+        resolution = fit_resolution(df, MAX_BARS)
+    resolution = order[max(order.index(resolution), order.index(fit_resolution(df, MAX_POINTS)))]
+    return resolution, resample(df, resolution, sums=['count_of_sales'], means=['average_price'], weight='count_of_sales')